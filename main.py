@@ -1,18 +1,2487 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, colorchooser, font
+import reportlab
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4, LETTER, LEGAL
 from reportlab.lib.colors import HexColor
 from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle, PageBreak
+from reportlab.platypus.doctemplate import ActionFlowable
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT, TA_JUSTIFY
 import os
 import json
 import sys
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
 import math
-from PIL import Image as PILImage, ImageTk
+import io
+import hashlib
+from collections import Counter, deque, OrderedDict
+import threading
+import queue
+import re
+import csv
+import copy
+import itertools
+import bisect
+import struct
+import tempfile
+import shutil
+import zipfile
+from array import array
+from xml.sax.saxutils import escape as xml_escape
+from concurrent.futures import wait, FIRST_COMPLETED
+from PIL import Image as PILImage, ImageTk, ImageDraw, ImageFont
+
+DEFAULT_TEXT = "Commencez à taper votre texte ici...\n\nUtilisez les outils pour formater votre document."
+PAGE_FORMATS = {"A4": A4, "Letter": LETTER, "Legal": LEGAL}
+# Taille du canvas utilisée pour l'échelle quand le template ne la précise pas
+DEFAULT_CANVAS_SIZE = (800, 600)
+
+
+def get_reportlab_font(font_family):
+    """Convertir le nom de police Tkinter vers ReportLab"""
+    font_map = {
+        'Arial': 'Helvetica',
+        'Times': 'Times-Roman',
+        'Courier': 'Courier',
+        'Verdana': 'Helvetica',
+        'Helvetica': 'Helvetica',
+        'Times-Roman': 'Times-Roman'
+    }
+    return font_map.get(font_family, 'Helvetica')
+
+
+# === FORMES ===
+
+_FONTS = {}
+
+
+def intern_color(color):
+    """Couleur partagée entre toutes les formes qui l'utilisent"""
+    return sys.intern(color) if isinstance(color, str) else color
+
+
+def intern_font(font_spec):
+    """Police (tuple) partagée entre toutes les formes qui l'utilisent"""
+    if isinstance(font_spec, str):
+        return sys.intern(font_spec)
+    font_spec = tuple(font_spec)
+    return _FONTS.setdefault(font_spec, font_spec)
+
+
+class ShapeRecord:
+    """Forme du document en représentation compacte.
+    
+    Attributs à emplacements fixes (__slots__), coordonnées en array('d')
+    et couleurs/polices internées. L'objet se manipule comme le dict qu'il
+    remplace : shape['coords'], shape.get('text'), 'font' in shape,
+    shape.update(...). Une propriété à None est considérée comme absente.
+    """
+    __slots__ = ('type', '_coords', 'color', 'width', 'text', 'font', 'id', 'uid')
+    
+    KEYS = ('type', 'coords', 'color', 'width', 'text', 'font', 'id', 'uid')
+    
+    def __init__(self, type, coords, color, width=None, text=None, font=None, id=None, uid=None):
+        self.type = sys.intern(type)
+        self.coords = coords
+        self.color = intern_color(color)
+        self.width = width
+        self.text = text
+        self.font = None if font is None else intern_font(font)
+        self.id = id
+        self.uid = uid
+        
+    @property
+    def coords(self):
+        return self._coords
+        
+    @coords.setter
+    def coords(self, value):
+        self._coords = value if isinstance(value, array) and value.typecode == 'd' else array('d', value)
+        
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{key: data[key] for key in cls.KEYS if key in data})
+        
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is None and key not in ('id', 'uid'):
+            raise KeyError(key)
+        return value
+        
+    def __setitem__(self, key, value):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        if key == 'color':
+            value = intern_color(value)
+        elif key == 'font' and value is not None:
+            value = intern_font(value)
+        elif key == 'type':
+            value = sys.intern(value)
+        setattr(self, key, value)
+        
+    def __delitem__(self, key):
+        self[key] = None
+        
+    def __contains__(self, key):
+        return key in self.KEYS and getattr(self, key) is not None
+        
+    def __iter__(self):
+        return (key for key in self.KEYS if getattr(self, key) is not None)
+        
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self.KEYS else None
+        return default if value is None else value
+        
+    def keys(self):
+        return list(self)
+        
+    def items(self):
+        return [(key, getattr(self, key)) for key in self]
+        
+    def update(self, other=(), **changes):
+        for key, value in dict(other, **changes).items():
+            self[key] = value
+            
+    def serialize(self):
+        """Données sauvegardées de la forme (voir serialize_shape)"""
+        data = {'type': self.type, 'coords': self._coords.tolist(), 'color': self.color}
+        if self.text is not None:
+            data['text'] = self.text
+        if self.font is not None:
+            data['font'] = self.font
+        if self.width is not None:
+            data['width'] = self.width
+        return data
+        
+    def copy(self):
+        """Copie indépendante (les coordonnées sont dupliquées)"""
+        return ShapeRecord(self.type, array('d', self._coords), self.color, self.width,
+                           self.text, self.font, self.id, self.uid)
+        
+    def __repr__(self):
+        return f"ShapeRecord({dict(self.items())!r})"
+
+
+def serialize_shape(shape):
+    """Sérialiser une forme pour la sauvegarde"""
+    if isinstance(shape, ShapeRecord):
+        return shape.serialize()
+    serialized = {
+        'type': shape['type'],
+        'coords': list(shape['coords']),
+        'color': shape['color']
+    }
+    if 'text' in shape:
+        serialized['text'] = shape['text']
+    if 'font' in shape:
+        serialized['font'] = shape['font']
+    if 'width' in shape:
+        serialized['width'] = shape['width']
+    return serialized
+
+
+def serialize_image(img):
+    """Sérialiser une image pour la sauvegarde"""
+    return {
+        'path': img['path'],
+        'coords': img['coords']
+    }
+
+
+def serialize_table(table):
+    """Sérialiser un tableau pour la sauvegarde"""
+    data = {
+        'coords': table['coords'],
+        'rows': table['rows'],
+        'cols': table['cols'],
+        'data': table['data'],
+        'cell_width': table['cell_width'],
+        'cell_height': table['cell_height']
+    }
+    if table.get('source'):
+        # Tableau lié à un fichier de données : data n'en garde que l'aperçu
+        data['source'] = table['source']
+        data['columns'] = table['columns']
+    return data
+
+
+def serialize_object(kind, obj):
+    """Sérialiser un objet selon sa liste ('shapes', 'images' ou 'tables')"""
+    if kind == 'shapes':
+        return serialize_shape(obj)
+    if kind == 'images':
+        return serialize_image(obj)
+    return serialize_table(obj)
+
+
+def object_signature(kind, obj):
+    """Empreinte du contenu sauvegardé d'un objet (deux objets identiques ont la même)"""
+    return json.dumps(serialize_object(kind, obj), sort_keys=True)
+
+
+# Type d'item canvas de chaque type de forme
+SHAPE_ITEM_TYPES = {'rectangle': 'rectangle', 'circle': 'oval', 'line': 'line',
+                    'freehand': 'line', 'text': 'text'}
+
+
+def shape_item_options(shape, zoom=1.0):
+    """Options de l'item canvas d'une forme (à la création comme à la mise à jour en place)"""
+    width = shape.get('width', 2) if zoom == 1.0 else shape.get('width', 2) * zoom
+    if shape['type'] in ('rectangle', 'circle'):
+        return {'outline': shape['color'], 'width': width}
+    if shape['type'] == 'text':
+        return {'text': shape.get('text', ''), 'font': scale_font(shape.get('font', ('Arial', 12)), zoom),
+                'fill': shape['color'], 'anchor': "nw"}
+    freehand = shape['type'] == 'freehand'
+    return {'fill': shape['color'], 'width': width,
+            'capstyle': tk.ROUND if freehand else tk.BUTT, 'joinstyle': tk.ROUND, 'smooth': freehand}
+
+
+def scale_font(font_spec, zoom):
+    """Police (famille, taille, styles...) agrandie selon le zoom"""
+    if zoom == 1.0 or len(font_spec) < 2:
+        return font_spec
+    size = int(font_spec[1])
+    return (font_spec[0], int(math.copysign(max(1, round(abs(size) * zoom)), size))) + tuple(font_spec[2:])
+
+
+def scale_coords(coords, zoom):
+    """Coordonnées du modèle converties en coordonnées du canvas"""
+    return coords if zoom == 1.0 else [c * zoom for c in coords]
+
+
+def deserialize_shape(shape_data):
+    """Désérialiser une forme"""
+    return ShapeRecord(
+        shape_data['type'],
+        shape_data['coords'],
+        shape_data['color'],
+        text=shape_data.get('text', ''),
+        font=shape_data.get('font', ('Arial', 12)),
+        width=shape_data.get('width', 2)
+    )
+
+
+def deserialize_table(table_data):
+    """Désérialiser un tableau"""
+    table = {
+        'coords': table_data['coords'],
+        'rows': table_data['rows'],
+        'cols': table_data['cols'],
+        'data': table_data['data'],
+        'cell_width': table_data['cell_width'],
+        'cell_height': table_data['cell_height'],
+        'items': []  # Sera rempli lors du redessin
+    }
+    if table_data.get('source'):
+        table['source'] = table_data['source']
+        table['columns'] = table_data['columns']
+    return table
+
+
+def table_grid_polyline(x, y, rows, cols, cell_width, cell_height):
+    """Lignes intérieures d'une grille en une seule polyligne [x1, y1, x2, y2, ...].
+    
+    Les lignes sont parcourues en serpentin, reliées le long du cadre (qui est
+    dessiné par ailleurs). Liste vide si la grille n'a qu'une cellule.
+    """
+    right, bottom = x + cols * cell_width, y + rows * cell_height
+    points = []
+    for i in range(1, rows):
+        line_y = y + i * cell_height
+        start, end = (x, right) if i % 2 else (right, x)
+        points += [start, line_y, end, line_y]
+    if points and cols > 1:
+        # Rejoindre le bord supérieur en longeant le cadre
+        points += [points[-2], y]
+    for j in range(1, cols):
+        line_x = x + j * cell_width
+        start, end = (y, bottom) if j % 2 else (bottom, y)
+        points += [line_x, start, line_x, end]
+    return points
+
+
+def table_cells(table):
+    """Cellules non vides d'un tableau : (ligne, colonne, texte)"""
+    for i, row in enumerate(table['data'][:table['rows']]):
+        for j, text in enumerate(row[:table['cols']]):
+            if text:
+                yield i, j, str(text)
+
+
+def read_table_source(path, preview_rows):
+    """Colonnes et premières lignes d'un fichier CSV ou JSONL (aperçu d'un tableau lié)"""
+    records = iter_records(path)
+    try:
+        first = next(records, None)
+        if not first:
+            raise ValueError("la source ne contient aucun enregistrement")
+        columns = list(first)
+        rows = list(itertools.islice(itertools.chain([first], records), max(0, preview_rows)))
+    finally:
+        records.close()
+    return columns, [record_row(record, columns) for record in rows]
+
+
+def record_row(record, columns):
+    """Valeurs d'un enregistrement dans l'ordre des colonnes du tableau"""
+    row = []
+    for column in columns:
+        value = record.get(column)
+        row.append('' if value is None else str(value))
+    return row
+
+
+def simplify_polyline(coords, tolerance):
+    """Simplifier une polyligne [x1, y1, x2, y2, ...] (Ramer-Douglas-Peucker)"""
+    points = list(zip(coords[0::2], coords[1::2]))
+    if tolerance <= 0 or len(points) < 3:
+        return list(coords)
+    
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    tolerance_sq = tolerance * tolerance
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = points[first]
+        dx = points[last][0] - x1
+        dy = points[last][1] - y1
+        length_sq = dx * dx + dy * dy
+        
+        # Point le plus éloigné du segment [first, last]
+        max_dist, index = 0.0, None
+        for i in range(first + 1, last):
+            px, py = points[i]
+            if length_sq:
+                cross = dx * (py - y1) - dy * (px - x1)
+                dist = cross * cross / length_sq
+            else:
+                dist = (px - x1) ** 2 + (py - y1) ** 2
+            if dist > max_dist:
+                max_dist, index = dist, i
+                
+        if index is not None and max_dist > tolerance_sq:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    
+    simplified = []
+    for point, kept in zip(points, keep):
+        if kept:
+            simplified.extend(point)
+    return simplified
+
+
+class DocumentModel:
+    """Modèle de document indépendant de Tk, au format des templates JSON v2.0"""
+    def __init__(self):
+        self.text = DEFAULT_TEXT
+        self.bg_color = "#FFFFFF"
+        self.text_color = "#000000"
+        self.font_family = "Helvetica"
+        self.font_size = 12
+        self.text_align = TA_LEFT
+        self.line_spacing = 1.2
+        self.margin_left = 50
+        self.margin_right = 50
+        self.margin_top = 50
+        self.margin_bottom = 50
+        self.page_format_name = "A4"
+        self.canvas_size = DEFAULT_CANVAS_SIZE
+        # Itérable de lignes de texte brut lu à l'export à la place de text (non sauvegardé)
+        self.text_stream = None
+        
+        self.shapes = []
+        self.images = []
+        self.tables = []
+        
+    @property
+    def page_format(self):
+        return PAGE_FORMATS.get(self.page_format_name, A4)
+        
+    @classmethod
+    def from_dict(cls, data):
+        """Construire un document à partir des données d'un template"""
+        document = cls()
+        document.text = data.get('text', DEFAULT_TEXT)
+        document.bg_color = data.get('bg_color', '#FFFFFF')
+        document.text_color = data.get('text_color', '#000000')
+        document.font_family = data.get('font_family', 'Helvetica')
+        document.font_size = data.get('font_size', 12)
+        document.text_align = data.get('text_align', TA_LEFT)
+        document.line_spacing = data.get('line_spacing', 1.2)
+        
+        margins = data.get('margins', {})
+        document.margin_left = margins.get('left', 50)
+        document.margin_right = margins.get('right', 50)
+        document.margin_top = margins.get('top', 50)
+        document.margin_bottom = margins.get('bottom', 50)
+        
+        document.page_format_name = data.get('page_format', 'A4')
+        document.canvas_size = tuple(data.get('canvas_size', DEFAULT_CANVAS_SIZE))
+        
+        document.shapes = [deserialize_shape(s) for s in data.get('shapes', [])]
+        document.images = [{'path': i['path'], 'coords': i['coords'], 'id': None}
+                           for i in data.get('images', [])]
+        document.tables = [deserialize_table(t) for t in data.get('tables', [])]
+        return document
+        
+    @classmethod
+    def load(cls, file_path):
+        """Charger un template JSON (ou un projet .pdfproj)"""
+        if is_project_file(file_path):
+            return load_project(file_path)
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+        
+    def to_dict(self, with_shapes=True):
+        """Sérialiser le document au format des templates"""
+        data = {
+            'text': self.text,
+            'bg_color': self.bg_color,
+            'text_color': self.text_color,
+            'font_family': self.font_family,
+            'font_size': self.font_size,
+            'text_align': self.text_align,
+            'line_spacing': self.line_spacing,
+            'margins': {
+                'left': self.margin_left,
+                'right': self.margin_right,
+                'top': self.margin_top,
+                'bottom': self.margin_bottom
+            },
+            'page_format': self.page_format_name,
+            'canvas_size': list(self.canvas_size),
+            'shapes': [serialize_shape(s) for s in self.shapes] if with_shapes else None,
+            'images': [serialize_image(i) for i in self.images],
+            'tables': [serialize_table(t) for t in self.tables],
+            'created_at': datetime.now().isoformat(),
+            'version': '2.0'
+        }
+        if not with_shapes:
+            del data['shapes']
+        return data
+        
+    def save(self, file_path):
+        """Sauvegarder le document en template JSON (ou en projet selon l'extension)"""
+        if is_project_file(file_path):
+            save_project(self, file_path)
+            return
+        with open(file_path, 'w', encoding='utf-8') as f:
+            write_template_json(self.to_dict(), f)
+
+
+def write_template_json(data, f):
+    """Écrire un template en JSON indenté, à raison d'un objet par ligne dans les listes.
+    
+    Chaque élément est encodé d'un bloc par l'encodeur C du module json
+    (l'encodeur indenté est écrit en Python et bien plus lent).
+    """
+    f.write('{\n')
+    for n, (key, value) in enumerate(data.items()):
+        f.write(f'  {json.dumps(key)}: ')
+        if isinstance(value, list) and value and isinstance(value[0], dict):
+            f.write('[\n' + ',\n'.join('    ' + json.dumps(v, ensure_ascii=False) for v in value) + '\n  ]')
+        else:
+            f.write(json.dumps(value, indent=2, ensure_ascii=False).replace('\n', '\n  '))
+        f.write(',\n' if n < len(data) - 1 else '\n')
+    f.write('}\n')
+
+
+# === FORMAT PROJET (ZIP) ===
+
+PROJECT_EXTENSION = ".pdfproj"
+PROJECT_FORMAT = "pdf-create-project"
+# Dossier où sont extraites les images embarquées (partagé, adressé par contenu)
+PROJECT_ASSET_DIR = os.path.join(tempfile.gettempdir(), "pdf-create-assets")
+# Une forme dans la table binaire : indices du type, de la couleur, du texte et de la
+# police dans la table de chaînes (-1 = absent), épaisseur (NaN = absente), boîte
+# englobante, position et nombre de ses coordonnées dans shapes/coords.bin
+SHAPE_STRUCT = struct.Struct('<iiiid4dQI')
+
+
+def is_project_file(file_path):
+    return file_path.lower().endswith(PROJECT_EXTENSION)
+
+
+def image_source(img):
+    """Fichier à lire pour une image : copie extraite d'un projet, sinon son chemin d'origine"""
+    return img.get('source') or img['path']
+
+
+def save_project(document, file_path):
+    """Sauvegarder un document au format projet.
+    
+    Le zip contient document.json (propriétés, images et tableaux), la table
+    binaire des formes avec sa table de chaînes, les coordonnées brutes
+    (float64, non compressées pour permettre un accès direct) et une copie de
+    chaque image, nommée par l'empreinte de son contenu.
+    """
+    strings = {None: -1}
+    font_refs = {None: -1}
+    pack = SHAPE_STRUCT.pack
+    table = bytearray()
+    coords_chunks = []
+    offset = 0
+    for shape in document.shapes:
+        if not isinstance(shape, ShapeRecord):
+            shape = ShapeRecord.from_dict(shape)
+        coords = shape.coords
+        width = shape.width
+        if shape.type == 'text':
+            bbox = object_bounds('shapes', shape)
+        elif not coords:
+            # Tracé vide (main levée sans point) : conservé tel quel, boîte nulle
+            bbox = (0.0, 0.0, 0.0, 0.0)
+        else:
+            pad = (width or 0) / 2
+            xs, ys = coords[0::2], coords[1::2]
+            bbox = (min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad)
+        refs = []
+        for value in (shape.type, shape.color, shape.text):
+            ref = strings.get(value)
+            if ref is None:
+                ref = strings[value] = len(strings) - 1
+            refs.append(ref)
+        font_ref = font_refs.get(shape.font)
+        if font_ref is None:
+            font_ref = font_refs[shape.font] = strings.setdefault(json.dumps(shape.font), len(strings) - 1)
+        if sys.byteorder == 'big':
+            coords = array('d', coords)
+            coords.byteswap()
+        table += pack(refs[0], refs[1], refs[2], font_ref,
+                      math.nan if width is None else width, *bbox, offset, len(coords))
+        coords_chunks.append(coords.tobytes())
+        offset += len(coords)
+    del strings[None]
+        
+    data = document.to_dict(with_shapes=False)
+    data['format'] = PROJECT_FORMAT
+    data['shape_count'] = len(document.shapes)
+    
+    tmp_path = file_path + ".tmp"
+    with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        blobs = set()
+        for entry, img in zip(data['images'], document.images):
+            entry['blob'] = None
+            try:
+                with open(image_source(img), 'rb') as f:
+                    content = f.read()
+            except OSError:
+                continue
+            blob = hashlib.sha1(content).hexdigest() + os.path.splitext(img['path'])[1].lower()
+            entry['blob'] = blob
+            if blob not in blobs:
+                blobs.add(blob)
+                archive.writestr(f"images/{blob}", content, zipfile.ZIP_STORED)
+        archive.writestr("document.json", json.dumps(data, ensure_ascii=False))
+        archive.writestr("shapes/strings.json", json.dumps(list(strings), ensure_ascii=False))
+        archive.writestr("shapes/table.bin", bytes(table))
+        archive.writestr("shapes/coords.bin", b"".join(coords_chunks), zipfile.ZIP_STORED)
+    os.replace(tmp_path, file_path)
+
+
+class ProjectReader:
+    """Lecture d'un projet : propriétés immédiates, formes et images à la demande.
+    
+    La table des formes (quelques dizaines d'octets par forme) suffit pour
+    sélectionner des formes par position ou par zone ; seules les coordonnées
+    des formes demandées sont ensuite lues.
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.archive = zipfile.ZipFile(file_path)
+        self.meta = json.loads(self.archive.read("document.json"))
+        if self.meta.get('format') != PROJECT_FORMAT:
+            raise ValueError(f"{file_path} n'est pas un projet PDF")
+        self._strings = None
+        self._fonts = {}
+        self._records = None
+        
+    def close(self):
+        self.archive.close()
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, *exc):
+        self.close()
+        
+    @property
+    def shape_count(self):
+        return self.meta['shape_count']
+        
+    @property
+    def records(self):
+        """Enregistrements bruts de la table des formes"""
+        if self._records is None:
+            self._strings = json.loads(self.archive.read("shapes/strings.json"))
+            self._records = list(SHAPE_STRUCT.iter_unpack(self.archive.read("shapes/table.bin")))
+        return self._records
+        
+    def shapes_in(self, x1, y1, x2, y2):
+        """Positions des formes dont la boîte englobante touche la zone"""
+        return [i for i, r in enumerate(self.records)
+                if r[5] <= x2 and x1 <= r[7] and r[6] <= y2 and y1 <= r[8]]
+        
+    def _shape(self, record, coords):
+        strings = self._strings
+        type_ref, color_ref, text_ref, font_ref, width = record[:5]
+        if sys.byteorder == 'big':
+            coords.byteswap()
+        if width != width:
+            width = None
+        elif width.is_integer():
+            width = int(width)
+        font_spec = self._fonts.get(font_ref)
+        if font_spec is None and font_ref >= 0:
+            font_spec = self._fonts[font_ref] = json.loads(strings[font_ref])
+        return ShapeRecord(
+            strings[type_ref], coords, strings[color_ref],
+            width=width,
+            text=None if text_ref < 0 else strings[text_ref],
+            font=font_spec)
+        
+    def iter_shapes(self, indices=None):
+        """Formes (toutes, ou aux positions croissantes indiquées), lues au fil du fichier"""
+        records = self.records
+        if indices is None:
+            indices = range(len(records))
+        with self.archive.open("shapes/coords.bin") as f:
+            for i in indices:
+                record = records[i]
+                f.seek(record[9] * 8)
+                coords = array('d')
+                coords.frombytes(f.read(record[10] * 8))
+                yield self._shape(record, coords)
+                
+    def load_shapes(self):
+        """Toutes les formes, en une seule lecture des coordonnées"""
+        records = self.records
+        values = array('d')
+        values.frombytes(self.archive.read("shapes/coords.bin"))
+        return [self._shape(r, values[r[9]:r[9] + r[10]]) for r in records]
+        
+    def image_file(self, blob):
+        """Chemin d'une copie locale d'une image embarquée"""
+        path = os.path.join(PROJECT_ASSET_DIR, blob)
+        if not os.path.exists(path):
+            os.makedirs(PROJECT_ASSET_DIR, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(self.archive.read(f"images/{blob}"))
+            os.replace(tmp_path, path)
+        return path
+        
+    def document(self, region=None):
+        """DocumentModel du projet ; avec region=(x1, y1, x2, y2), seules les formes de la zone"""
+        document = DocumentModel.from_dict(dict(self.meta, shapes=[]))
+        if region is None:
+            document.shapes = self.load_shapes()
+        else:
+            document.shapes = list(self.iter_shapes(self.shapes_in(*region)))
+        for img, entry in zip(document.images, self.meta.get('images', [])):
+            if entry.get('blob'):
+                img['source'] = self.image_file(entry['blob'])
+        return document
+
+
+def load_project(file_path, region=None):
+    """Charger un projet (voir ProjectReader.document)"""
+    with ProjectReader(file_path) as reader:
+        return reader.document(region)
+
+
+# Résolution par défaut des images embarquées dans les PDF
+DEFAULT_IMAGE_DPI = 300
+
+
+class PDFImagePool:
+    """Images d'export PDF : une source distincte (par contenu) = un seul ImageReader.
+    
+    Les images sont réduites à leur taille de placement pour la résolution
+    demandée et peuvent être recompressées en JPEG (qualité 1-95).
+    """
+    max_readers = 256
+    
+    def __init__(self, dpi=DEFAULT_IMAGE_DPI, jpeg_quality=None):
+        self.dpi = dpi
+        self.jpeg_quality = jpeg_quality
+        self._digests = {}
+        self._readers = OrderedDict()
+        
+    def content_hash(self, path):
+        """Empreinte du contenu d'un fichier (mémorisée par chemin, mtime et taille)"""
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        digest = self._digests.get(key)
+        if digest is None:
+            sha = hashlib.sha1()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    sha.update(chunk)
+            digest = self._digests[key] = sha.hexdigest()
+        return digest
+        
+    def reader_for(self, path, width, height):
+        """ImageReader d'une image placée sur width x height points"""
+        max_px = (max(1, math.ceil(width / 72 * self.dpi)), max(1, math.ceil(height / 72 * self.dpi)))
+        key = (self.content_hash(path), max_px)
+        reader = self._readers.get(key)
+        if reader is not None:
+            self._readers.move_to_end(key)
+            return reader
+        
+        pil_image = PILImage.open(path)
+        if pil_image.width > max_px[0] or pil_image.height > max_px[1]:
+            # draft() laisse le décodeur JPEG réduire l'image dès la lecture
+            pil_image.draft('RGB', max_px)
+            pil_image.thumbnail(max_px, PILImage.Resampling.LANCZOS)
+        if self.jpeg_quality and pil_image.mode in ('RGB', 'L', 'CMYK'):
+            buffer = io.BytesIO()
+            pil_image.save(buffer, format='JPEG', quality=self.jpeg_quality, optimize=True)
+            buffer.seek(0)
+            reader = ImageReader(buffer)
+        else:
+            reader = ImageReader(pil_image)
+            
+        self._readers[key] = reader
+        if len(self._readers) > self.max_readers:
+            self._readers.popitem(last=False)
+        return reader
+
+
+# Nombre de paragraphes analysés gardés en cache
+PARAGRAPH_CACHE_SIZE = 8192
+
+
+class CachedParagraph(Paragraph):
+    """Paragraph dont la mise en page est mémorisée : coupure en lignes par
+    largeur disponible, découpage en fin de page par (largeur, hauteur).
+    
+    Les copies d'un même paragraphe du cache partagent ces mémos, et les
+    morceaux d'un découpage mémorisé ont les leurs : un paragraphe inchangé
+    retrouve sa mise en page tant qu'il tombe au même endroit de la page.
+    """
+    _wrap_memo = None
+    _split_memo = None
+    
+    def wrap(self, availWidth, availHeight):
+        memo = self._wrap_memo
+        if memo is None:
+            return Paragraph.wrap(self, availWidth, availHeight)
+        cached = memo.get(availWidth)
+        if cached is None:
+            size = Paragraph.wrap(self, availWidth, availHeight)
+            if hasattr(self, 'blPara'):
+                memo[availWidth] = (self._wrapWidths, self.blPara, self.height)
+            return size
+        self.width = availWidth
+        self._wrapWidths, self.blPara, self.height = cached
+        return self.width, self.height
+        
+    def split(self, availWidth, availHeight):
+        memo = self._split_memo
+        if memo is None:
+            return Paragraph.split(self, availWidth, availHeight)
+        pieces = memo.get((availWidth, availHeight))
+        if pieces is None:
+            # split() modifie les lignes qu'il découpe : coupure privée, le mémo de wrap reste intact
+            Paragraph.wrap(self, availWidth, availHeight)
+            pieces = Paragraph.split(self, availWidth, availHeight)
+            for piece in pieces:
+                if isinstance(piece, CachedParagraph):
+                    piece.enable_memo()
+            memo[(availWidth, availHeight)] = pieces
+        # Les morceaux mémorisés ne sont jamais mis en page eux-mêmes
+        return [copy.copy(piece) for piece in pieces]
+        
+    def enable_memo(self):
+        self._wrap_memo = {}
+        self._split_memo = {}
+
+
+class ParagraphCache:
+    """Cache LRU des paragraphes du corps du texte, analysés et coupés en lignes une seule fois.
+    
+    La clé est (balisage, style) : d'un export à l'autre, seuls les
+    paragraphes modifiés sont analysés et recoupés. Chaque appel retourne une
+    copie, l'original du cache n'est jamais mis en page.
+    """
+    def __init__(self, max_entries=PARAGRAPH_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        
+    def paragraph(self, markup, style_key, style):
+        key = (markup, style_key)
+        with self.lock:
+            paragraph = self.entries.get(key)
+            if paragraph is not None:
+                self.entries.move_to_end(key)
+        if paragraph is None:
+            paragraph = CachedParagraph(markup, style)
+            paragraph.enable_memo()
+            with self.lock:
+                self.entries[key] = paragraph
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return copy.copy(paragraph)
+
+
+PARAGRAPH_CACHE = ParagraphCache()
+_paragraph_styles = {}
+
+
+def body_text_style(document):
+    """(clé, ParagraphStyle) du corps du texte, un seul style par jeu de réglages"""
+    key = (document.font_family, document.font_size, document.text_color, document.text_align,
+           document.line_spacing, document.bg_color)
+    style = _paragraph_styles.get(key)
+    if style is None:
+        style = _paragraph_styles[key] = ParagraphStyle(
+            'CustomStyle',
+            parent=getSampleStyleSheet()['Normal'],
+            fontName=get_reportlab_font(document.font_family),
+            fontSize=document.font_size,
+            textColor=HexColor(document.text_color),
+            alignment=document.text_align,
+            leading=document.font_size * document.line_spacing,
+            backColor=HexColor(document.bg_color) if document.bg_color != '#FFFFFF' else None
+        )
+    return key, style
+
+
+def split_paragraphs(text):
+    """Blocs d'un texte séparés par une ligne vide, comme text.split('\\n\\n') mais à la demande"""
+    start = 0
+    while True:
+        end = text.find('\n\n', start)
+        if end < 0:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 2
+
+
+def read_paragraphs(lines):
+    """Paragraphes (séparés par des lignes vides) d'un itérable de lignes, lus au fil de l'eau"""
+    block = []
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line.strip():
+            block.append(line)
+        elif block:
+            yield '\n'.join(block)
+            block = []
+    if block:
+        yield '\n'.join(block)
+
+
+class LazyStory:
+    """Story ReportLab alimentée à la demande par un itérable de flowables.
+    
+    doc.build consomme la story par le début (lecture, suppression et
+    réinsertion des morceaux coupés) : seuls quelques flowables sont
+    matérialisés à la fois. len() ne compte que les flowables déjà lus.
+    """
+    lookahead = 2
+    
+    def __init__(self, flowables):
+        self._source = iter(flowables)
+        self._buffer = []
+        self._exhausted = False
+        
+    def _fill(self, size=None):
+        while not self._exhausted and (size is None or len(self._buffer) < size):
+            try:
+                self._buffer.append(next(self._source))
+            except StopIteration:
+                self._exhausted = True
+                
+    def _fill_for(self, index):
+        if isinstance(index, slice):
+            self._fill(index.stop if index.stop is not None and index.stop >= 0 else None)
+        else:
+            self._fill(index + 1 if index >= 0 else None)
+            
+    def __len__(self):
+        self._fill(self.lookahead)
+        return len(self._buffer)
+        
+    def __getitem__(self, index):
+        self._fill_for(index)
+        return self._buffer[index]
+        
+    def __setitem__(self, index, value):
+        self._fill_for(index)
+        self._buffer[index] = value
+        
+    def __delitem__(self, index):
+        self._fill_for(index)
+        del self._buffer[index]
+        
+    def insert(self, index, value):
+        self._buffer.insert(index, value)
+
+
+class _UseRenderer(ActionFlowable):
+    """Marqueur de story : les pages suivantes sont dessinées par ce renderer"""
+    def __init__(self, renderer):
+        ActionFlowable.__init__(self)
+        self.renderer = renderer
+        
+    def apply(self, doc):
+        doc.current_renderer = self.renderer
+
+
+class PDFRenderer:
+    """Génération PDF d'un DocumentModel, sans racine Tk ni affichage"""
+    def __init__(self, document, image_pool=None):
+        self.document = document
+        self.image_pool = image_pool or PDFImagePool()
+        self._stroke_style = None
+        self._fill_color = None
+        # Form XObject des graphiques de page, et canvas PDF pour lequel il a été défini
+        self._form_name = None
+        self._form_canvas = None
+        
+    def create_doc_template(self, file_path):
+        """Créer le gabarit ReportLab (format et marges du document)"""
+        document = self.document
+        # Mode invariant : ni date ni identifiant aléatoire, un même document donne les mêmes octets
+        return SimpleDocTemplate(file_path, pagesize=document.page_format,
+                               leftMargin=document.margin_left, rightMargin=document.margin_right,
+                               topMargin=document.margin_top, bottomMargin=document.margin_bottom,
+                               invariant=1)
+        
+    def render(self, file_path, on_progress=None):
+        """Générer le fichier PDF (lève une exception en cas d'échec).
+        
+        on_progress reçoit les événements de progression de ReportLab
+        (type, valeur), dont ('PAGE', numéro) à la fin de chaque page ; une
+        exception levée par le callback interrompt la génération.
+        """
+        doc = self.create_doc_template(file_path)
+        if on_progress is not None:
+            doc.setProgressCallBack(on_progress)
+        story = self.document_story()
+        if not isinstance(story, list):
+            story = LazyStory(story)
+        doc.build(story, onFirstPage=self.draw_graphics, onLaterPages=self.draw_graphics)
+        
+    def render_cached(self, file_path, cache, on_progress=None):
+        """Comme render, en reprenant le PDF du cache si le document n'a pas changé.
+        
+        Retourne True si le fichier vient du cache. Un document dont le texte
+        est lu d'un flux (text_stream) est toujours rendu.
+        """
+        if self.document.text_stream is not None:
+            self.render(file_path, on_progress)
+            return False
+        key = cache.document_key(self.document, self.image_pool)
+        if cache.fetch(key, file_path):
+            return True
+        self.render(file_path, on_progress)
+        cache.store(key, file_path)
+        return False
+        
+    @classmethod
+    def render_combined(cls, documents, file_path, image_pool=None):
+        """Rendre plusieurs documents dans un seul PDF, chacun à partir d'une nouvelle page.
+        
+        Les documents sont consommés au fil de la construction ; le format et les
+        marges sont ceux du premier document. Retourne le nombre de documents rendus.
+        """
+        image_pool = image_pool or PDFImagePool()
+        renderers = (cls(document, image_pool) for document in documents)
+        first = next(renderers, None)
+        if first is None:
+            raise ValueError("Aucun document à rendre")
+        count = 0
+        
+        def story():
+            nonlocal count
+            renderer = first
+            while renderer is not None:
+                count += 1
+                yield from renderer.document_story()
+                renderer = next(renderers, None)
+                if renderer is not None:
+                    # Le marqueur précède le saut de page : la page suivante
+                    # est dessinée avec les graphiques du nouveau document
+                    yield _UseRenderer(renderer)
+                    yield PageBreak()
+        
+        def draw_graphics(canvas_obj, doc_obj):
+            doc_obj.current_renderer.draw_graphics(canvas_obj, doc_obj)
+        
+        doc = first.create_doc_template(file_path)
+        doc.current_renderer = first
+        doc.build(LazyStory(story()), onFirstPage=draw_graphics, onLaterPages=draw_graphics)
+        return count
+        
+    def empty_story(self):
+        """Story d'une page sans texte, qui ne porte que les graphiques"""
+        # Un Spacer de la hauteur des marges dépasse le cadre (padding) : une
+        # hauteur minimale suffit à produire la page
+        return [Spacer(1, 1)]
+        
+    def document_story(self):
+        """Flowables du document : le texte, puis les lignes des tableaux liés à une source.
+        
+        Générateur : le texte et les sources sont lus au fil de la construction.
+        """
+        story = self.build_story()
+        first = next(story, None)
+        data_tables = [table for table in self.document.tables if table.get('source')]
+        if first is None and not data_tables:
+            return self.empty_story()
+        text = itertools.chain([first], story) if first is not None else []
+        return itertools.chain(text, self.data_tables_story(data_tables, page_break=first is not None))
+        
+    def data_tables_story(self, tables, page_break=False):
+        """Tableaux liés les uns à la suite des autres, chacun à partir d'une nouvelle page"""
+        for table in tables:
+            if page_break:
+                yield PageBreak()
+            yield from self.data_table_story(table)
+            page_break = True
+            
+    def data_table_story(self, table):
+        """Lignes d'un tableau lié, par pages entières précédées de la ligne d'en-tête.
+        
+        La source est lue enregistrement par enregistrement et chaque page est
+        un Table ReportLab distinct : seule la page en cours est en mémoire,
+        quel que soit le nombre de lignes.
+        """
+        document = self.document
+        scale = self.get_scale() or 1.0
+        font_size = max(6, int(8 * scale))
+        row_height = max(table['cell_height'] * scale, font_size + 4)
+        columns = table['columns']
+        col_widths = [table['cell_width'] * scale] * len(columns)
+        
+        # Lignes par page : hauteur du cadre (moins son padding) moins l'en-tête
+        frame_height = (document.page_format[1] - document.margin_top - document.margin_bottom - 12)
+        rows_per_page = max(1, int(frame_height // row_height) - 1)
+        style = TableStyle([
+            ('GRID', (0, 0), (-1, -1), 0.5, HexColor('#000000')),
+            ('FONT', (0, 0), (-1, -1), 'Helvetica', font_size),
+            ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', font_size),
+            ('BACKGROUND', (0, 0), (-1, 0), HexColor('#EEEEEE')),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ])
+        
+        def page_table(rows):
+            # repeatRows : l'en-tête est répété si ReportLab doit tout de même couper
+            return Table([columns] + rows, colWidths=col_widths, rowHeights=row_height,
+                         style=style, repeatRows=1, hAlign='LEFT')
+        
+        records = iter_records(table['source'])
+        try:
+            pages = 0
+            while True:
+                rows = [record_row(record, columns) for record in itertools.islice(records, rows_per_page)]
+                if not rows:
+                    break
+                if pages:
+                    yield PageBreak()
+                yield page_table(rows)
+                pages += 1
+            if not pages:
+                yield page_table([])
+        finally:
+            records.close()
+        
+    def build_story(self):
+        """Convertir le texte du document en flowables, paragraphe par paragraphe (générateur)"""
+        document = self.document
+        style_key, style = body_text_style(document)
+        if document.text_stream is not None:
+            # Texte brut lu une seule fois : échappé, et sans passer par le cache
+            for para_text in read_paragraphs(document.text_stream):
+                yield Paragraph(xml_escape(para_text).replace('\n', '<br/>'), style)
+                yield Spacer(1, 12)
+            return
+        
+        text_content = document.text.strip()
+        if text_content and text_content != DEFAULT_TEXT:
+            # Paragraphes analysés une fois, voir ParagraphCache
+            for para_text in split_paragraphs(text_content):
+                if para_text.strip():
+                    yield PARAGRAPH_CACHE.paragraph(para_text.replace('\n', '<br/>'), style_key, style)
+                    yield Spacer(1, 12)
+        
+    def get_scale(self):
+        """Calculer l'échelle canvas -> page"""
+        document = self.document
+        width, height = document.page_format
+        canvas_width, canvas_height = document.canvas_size
+        if canvas_width <= 0 or canvas_height <= 0:
+            return None
+        content_width = width - document.margin_left - document.margin_right
+        content_height = height - document.margin_top - document.margin_bottom
+        scale_x = content_width / canvas_width
+        scale_y = content_height / canvas_height
+        return min(scale_x, scale_y, 1.0)  # Ne pas agrandir
+        
+    def draw_graphics(self, canvas_obj, doc_obj):
+        """Placer le fond et les éléments graphiques sur une page.
+        
+        Ils sont dessinés une seule fois par PDF dans un form XObject, que
+        chaque page référence.
+        """
+        if self._form_canvas is not canvas_obj:
+            # Numérotés par canvas (plusieurs documents par PDF) : sortie reproductible
+            count = getattr(canvas_obj, '_page_graphics_forms', 0) + 1
+            canvas_obj._page_graphics_forms = count
+            self._form_name = f"pageGraphics{count}"
+            canvas_obj.beginForm(self._form_name)
+            self.draw_page_graphics(canvas_obj)
+            canvas_obj.endForm()
+            self._form_canvas = canvas_obj
+        canvas_obj.doForm(self._form_name)
+        
+    def draw_page_graphics(self, canvas_obj):
+        """Dessiner le fond et les éléments graphiques"""
+        document = self.document
+        width, height = document.page_format
+        canvas_obj.setFillColor(HexColor(document.bg_color))
+        canvas_obj.rect(0, 0, width, height, fill=1)
+        # Nouvel état graphique à chaque page
+        self._stroke_style = None
+        self._fill_color = document.bg_color
+        
+        if document.shapes or document.images or document.tables:
+            scale = self.get_scale()
+            if scale:
+                # Dessiner les formes
+                self.draw_shapes_on_pdf(canvas_obj, document.shapes, scale, width, height)
+                
+                # Dessiner les images
+                for img_data in document.images:
+                    self.draw_image_on_pdf(canvas_obj, img_data, scale, width, height)
+                
+                # Dessiner les tableaux (les tableaux liés font partie de la story)
+                for table_data in document.tables:
+                    if table_data.get('source'):
+                        continue
+                    self.draw_table_on_pdf(canvas_obj, table_data, scale, width, height)
+                    
+    def set_stroke_style(self, c, color, line_width):
+        """Changer la couleur et l'épaisseur du trait seulement si elles diffèrent"""
+        if self._stroke_style != (color, line_width):
+            c.setStrokeColor(HexColor(color))
+            c.setLineWidth(line_width)
+            self._stroke_style = (color, line_width)
+            
+    def set_fill_color(self, c, color):
+        """Changer la couleur de remplissage seulement si elle diffère"""
+        if self._fill_color != color:
+            c.setFillColor(HexColor(color))
+            self._fill_color = color
+            
+    def _shape_style(self, shape, scale):
+        # Vérifier que la couleur est valide
+        color = shape.get('color', '#000000')
+        if not color.startswith('#'):
+            color = '#000000'
+        return color, max(0.5, shape.get('width', 2) * scale)
+        
+    def draw_shapes_on_pdf(self, c, shapes, scale, pdf_width, pdf_height):
+        """Dessiner les formes, les contours consécutifs de même style formant un seul chemin"""
+        path = None
+        path_style = None
+        for shape in shapes:
+            style = None if shape['type'] == 'text' else self._shape_style(shape, scale)
+            if path is not None and style != path_style:
+                # Terminer le chemin en cours pour respecter l'ordre de superposition
+                self.set_stroke_style(c, *path_style)
+                c.drawPath(path, stroke=1, fill=0)
+                path = None
+            if style is None:
+                self.draw_shape_on_pdf(c, shape, scale, scale, pdf_width, pdf_height)
+                continue
+            if path is None:
+                path = c.beginPath()
+                path_style = style
+            self.add_shape_to_path(path, shape, scale, scale, pdf_height)
+        if path is not None:
+            self.set_stroke_style(c, *path_style)
+            c.drawPath(path, stroke=1, fill=0)
+            
+    def add_shape_to_path(self, path, shape, scale_x, scale_y, pdf_height):
+        """Ajouter le contour d'une forme à un chemin PDF"""
+        try:
+            shape_type = shape['type']
+            coords = shape['coords']
+            margin_left = self.document.margin_left
+            top = pdf_height - self.document.margin_top
+
+            if shape_type == 'rectangle' and len(coords) >= 4:
+                x1, y1, x2, y2 = coords[:4]
+                pdf_x1 = margin_left + x1 * scale_x
+                pdf_y1 = top - y1 * scale_y
+                pdf_x2 = margin_left + x2 * scale_x
+                pdf_y2 = top - y2 * scale_y
+
+                path.rect(min(pdf_x1, pdf_x2), min(pdf_y1, pdf_y2),
+                          abs(pdf_x2 - pdf_x1), abs(pdf_y2 - pdf_y1))
+
+            elif shape_type == 'circle' and len(coords) >= 4:
+                x1, y1, x2, y2 = coords[:4]
+                pdf_x1 = margin_left + min(x1, x2) * scale_x
+                pdf_y1 = top - max(y1, y2) * scale_y
+                path.ellipse(pdf_x1, pdf_y1, abs(x2 - x1) * scale_x, abs(y2 - y1) * scale_y)
+
+            elif shape_type in ['line', 'freehand'] and len(coords) >= 4:
+                # Une polyligne de n points = un seul sous-chemin
+                path.moveTo(margin_left + coords[0] * scale_x, top - coords[1] * scale_y)
+                for i in range(2, len(coords) - 1, 2):
+                    path.lineTo(margin_left + coords[i] * scale_x, top - coords[i + 1] * scale_y)
+
+        except Exception as e:
+            print(f"Erreur lors du dessin de la forme: {e}")
+            
+    def draw_shape_on_pdf(self, c, shape, scale_x, scale_y, pdf_width, pdf_height):
+        """Dessiner une forme sur le PDF"""
+        try:
+            coords = shape['coords']
+
+            if shape['type'] == 'text':
+                if len(coords) >= 2:
+                    x, y = coords[:2]
+                    pdf_x = self.document.margin_left + x * scale_x
+                    pdf_y = pdf_height - self.document.margin_top - y * scale_y
+
+                    color, _ = self._shape_style(shape, 1)
+                    self.set_fill_color(c, color)
+                    font_name, font_size = shape.get('font', ('Helvetica', 12))
+                    scaled_font_size = max(6, int(font_size * min(scale_x, scale_y)))
+                    c.setFont(get_reportlab_font(font_name), scaled_font_size)
+                    
+                    # S'assurer que le texte n'est pas None
+                    text = shape.get('text', '')
+                    if text is None:
+                        text = ''
+                    c.drawString(pdf_x, pdf_y, str(text))
+            else:
+                path = c.beginPath()
+                self.add_shape_to_path(path, shape, scale_x, scale_y, pdf_height)
+                self.set_stroke_style(c, *self._shape_style(shape, min(scale_x, scale_y)))
+                c.drawPath(path, stroke=1, fill=0)
+
+        except Exception as e:
+            print(f"Erreur lors du dessin de la forme: {e}")
+            
+    def draw_image_on_pdf(self, c, img_data, scale, pdf_width, pdf_height):
+        """Dessiner une image sur le PDF"""
+        try:
+            x, y = img_data['coords']
+            img_path = image_source(img_data)
+            
+            if os.path.exists(img_path):
+                pdf_x = self.document.margin_left + x * scale
+                pdf_y = pdf_height - self.document.margin_top - y * scale
+                
+                # Taille par défaut de l'image
+                img_width = 100 * scale
+                img_height = 100 * scale
+                
+                # Image réduite à sa taille de placement, partagée entre pages
+                reader = self.image_pool.reader_for(img_path, img_width, img_height)
+                c.drawImage(reader, pdf_x, pdf_y - img_height, 
+                           width=img_width, height=img_height, preserveAspectRatio=True)
+                
+        except Exception as e:
+            print(f"Erreur lors du dessin de l'image: {e}")
+            
+    def draw_table_on_pdf(self, c, table_data, scale, pdf_width, pdf_height):
+        """Dessiner un tableau sur le PDF"""
+        try:
+            x, y = table_data['coords']
+            rows, cols = table_data['rows'], table_data['cols']
+            cell_width, cell_height = table_data['cell_width'] * scale, table_data['cell_height'] * scale
+            left = self.document.margin_left + x * scale
+            top = pdf_height - self.document.margin_top - y * scale
+            
+            # Cadre et lignes intérieures : un seul chemin
+            path = c.beginPath()
+            path.rect(left, top - rows * cell_height, cols * cell_width, rows * cell_height)
+            for i in range(1, rows):
+                path.moveTo(left, top - i * cell_height)
+                path.lineTo(left + cols * cell_width, top - i * cell_height)
+            for j in range(1, cols):
+                path.moveTo(left + j * cell_width, top)
+                path.lineTo(left + j * cell_width, top - rows * cell_height)
+            self.set_stroke_style(c, "#000000", 1)
+            c.drawPath(path, stroke=1, fill=0)
+            
+            # Texte des cellules non vides : un seul objet texte, une seule police
+            font_size = max(6, int(8 * scale))
+            text = None
+            for i, j, cell_text in table_cells(table_data):
+                if text is None:
+                    text = c.beginText()
+                    text.setFont("Helvetica", font_size)
+                width = c.stringWidth(cell_text, "Helvetica", font_size)
+                text.setTextOrigin(left + (j + 0.5) * cell_width - width / 2, top - (i + 0.5) * cell_height)
+                text.textOut(cell_text)
+            if text is not None:
+                self.set_fill_color(c, "#000000")
+                c.drawText(text)
+                
+        except Exception as e:
+            print(f"Erreur lors du dessin du tableau: {e}")
+
+
+# === CACHE D'EXPORT ===
+
+# Propre à l'utilisateur : un dossier temporaire partagé permettrait à un autre
+# compte d'y déposer un PDF sous l'empreinte d'un document
+EXPORT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".pdf-create", "export-cache")
+# Taille maximale du cache d'export sur le disque (octets)
+DEFAULT_EXPORT_CACHE_BYTES = 256 * 1024 * 1024
+# À incrémenter quand le rendu d'un même document change
+EXPORT_CACHE_VERSION = 1
+
+
+class ExportCache:
+    """Cache disque des PDF rendus, indexé par une empreinte du document.
+    
+    L'empreinte couvre les données sauvegardées du document (celles de
+    save_template), le contenu des fichiers référencés (images, sources des
+    tableaux liés) et les options de rendu. Au-delà de max_bytes, les PDF
+    utilisés le moins récemment sont supprimés. Plusieurs processus peuvent
+    partager le dossier (écritures atomiques).
+    """
+    def __init__(self, directory=EXPORT_CACHE_DIR, max_bytes=DEFAULT_EXPORT_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        
+    def document_key(self, document, image_pool):
+        """Empreinte SHA-256 de tout ce qui détermine le PDF d'un document"""
+        data = document.to_dict()
+        del data['created_at']
+        sources = [image_source(img) for img in document.images]
+        sources += [table['source'] for table in document.tables if table.get('source')]
+        files = [image_pool.content_hash(path) if os.path.exists(path) else None for path in sources]
+        payload = json.dumps([EXPORT_CACHE_VERSION, reportlab.Version, image_pool.dpi,
+                              image_pool.jpeg_quality, data, files], sort_keys=True, default=list)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        
+    def path_for(self, key):
+        return os.path.join(self.directory, key + ".pdf")
+        
+    def fetch(self, key, file_path):
+        """Copier le PDF en cache vers file_path ; False s'il est absent ou illisible"""
+        cached = self.path_for(key)
+        try:
+            shutil.copyfile(cached, file_path)
+            # La date de modification sert d'ordre LRU
+            os.utime(cached)
+        except OSError:
+            return False
+        return True
+        
+    def store(self, key, file_path):
+        """Ajouter un PDF rendu au cache puis respecter la taille maximale.
+        
+        Le cache est facultatif : si le dossier ne peut pas être écrit
+        (droits, disque plein...), le PDF n'est simplement pas conservé.
+        """
+        cached = self.path_for(key)
+        temp_path = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            shutil.copyfile(file_path, temp_path)
+            os.replace(temp_path, cached)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+        self.evict()
+        
+    def evict(self):
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(".pdf"):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return
+        used = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if used <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            used -= size
+
+
+_export_cache = None
+
+
+def shared_export_cache():
+    """Cache d'export commun aux rendus de ce processus"""
+    global _export_cache
+    if _export_cache is None:
+        _export_cache = ExportCache()
+    return _export_cache
+
+
+# Période de scrutation d'un export PDF en cours (ms)
+EXPORT_POLL_MS = 100
+
+
+class ExportCancelled(Exception):
+    """Export PDF interrompu à la demande de l'utilisateur"""
+
+
+class ExportJob:
+    """Export PDF exécuté hors du thread Tk.
+    
+    Le document est un instantané : l'édition peut continuer pendant l'export.
+    page et cancel() sont partagés avec le thread Tk, qui suit la tâche par
+    scrutation (after) ; l'annulation prend effet au flowable suivant.
+    """
+    def __init__(self, document, file_path, on_done=None):
+        self.document = document
+        self.file_path = file_path
+        self.on_done = on_done
+        self.page = 0
+        self.cancelled = threading.Event()
+        self.future = None
+        self.from_cache = False
+        
+    def run(self):
+        renderer = PDFRenderer(self.document, shared_image_pool())
+        self.from_cache = renderer.render_cached(self.file_path, shared_export_cache(), self.on_progress)
+        
+    def on_progress(self, event, value):
+        if self.cancelled.is_set():
+            raise ExportCancelled()
+        if event == 'PAGE':
+            self.page = value
+            
+    def cancel(self):
+        self.cancelled.set()
+
+
+# === HISTORIQUE (ANNULER/RÉTABLIR) ===
+
+# Budget mémoire par défaut de l'historique d'annulation (octets estimés)
+DEFAULT_HISTORY_BUDGET = 16 * 1024 * 1024
+
+
+def estimate_size(value):
+    """Estimation grossière de la mémoire occupée par des données sérialisables"""
+    if isinstance(value, dict):
+        return 64 + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return 56 + sum(estimate_size(v) for v in value)
+    if isinstance(value, str):
+        return 49 + len(value)
+    return 24
+
+
+class EditCommand:
+    """Opération réversible : seuls les objets concernés sont touchés"""
+    def apply(self, editor):
+        raise NotImplementedError
+        
+    def revert(self, editor):
+        raise NotImplementedError
+        
+    def size(self):
+        return 64
+        
+    def objects(self, editor):
+        """Objets (kind, objet) touchés par l'opération"""
+        return []
+
+
+class AddCommand(EditCommand):
+    """Ajout d'un objet (kind: 'shapes', 'images' ou 'tables')"""
+    def __init__(self, kind, obj, index):
+        self.kind = kind
+        self.obj = obj
+        self.index = index
+        
+    def apply(self, editor):
+        editor.insert_object(self.kind, self.obj, self.index)
+        
+    def revert(self, editor):
+        editor.remove_object(self.kind, self.obj)
+        
+    def size(self):
+        return 64 + estimate_size(serialize_object(self.kind, self.obj))
+        
+    def objects(self, editor):
+        return [(self.kind, self.obj)]
+
+
+class DeleteCommand(AddCommand):
+    """Suppression d'un objet"""
+    def apply(self, editor):
+        AddCommand.revert(self, editor)
+        
+    def revert(self, editor):
+        AddCommand.apply(self, editor)
+
+
+class ModifyCommand(EditCommand):
+    """Modification de propriétés d'un objet (ex: texte)"""
+    def __init__(self, kind, obj, before, after):
+        self.kind = kind
+        self.obj = obj
+        self.before = before
+        self.after = after
+        
+    def apply(self, editor):
+        editor.update_object(self.kind, self.obj, self.after)
+        
+    def revert(self, editor):
+        editor.update_object(self.kind, self.obj, self.before)
+        
+    def size(self):
+        return 64 + estimate_size(self.before) + estimate_size(self.after)
+        
+    def objects(self, editor):
+        return [(self.kind, self.obj)]
+
+
+class MoveCommand(EditCommand):
+    """Déplacement d'un objet"""
+    def __init__(self, kind, obj, dx, dy):
+        self.kind = kind
+        self.obj = obj
+        self.dx = dx
+        self.dy = dy
+        
+    def apply(self, editor):
+        editor.move_object(self.kind, self.obj, self.dx, self.dy)
+        
+    def revert(self, editor):
+        editor.move_object(self.kind, self.obj, -self.dx, -self.dy)
+        
+    def objects(self, editor):
+        return [(self.kind, self.obj)]
+
+
+class ReorderCommand(EditCommand):
+    """Changement de position d'un objet dans sa liste (ordre des calques)"""
+    def __init__(self, kind, old_index, new_index):
+        self.kind = kind
+        self.old_index = old_index
+        self.new_index = new_index
+        
+    def apply(self, editor):
+        editor.reorder_object(self.kind, self.old_index, self.new_index)
+        
+    def revert(self, editor):
+        editor.reorder_object(self.kind, self.new_index, self.old_index)
+        
+    def objects(self, editor):
+        # L'objet déplacé est à l'une des deux positions, selon le sens
+        objects = getattr(editor, self.kind)
+        return [(self.kind, objects[self.old_index]), (self.kind, objects[self.new_index])]
+
+
+class BatchCommand(EditCommand):
+    """Groupe d'opérations annulées/rétablies en une fois (ex: sélection multiple)"""
+    def __init__(self, commands):
+        self.commands = commands
+        
+    def apply(self, editor):
+        for command in self.commands:
+            command.apply(editor)
+            
+    def revert(self, editor):
+        for command in reversed(self.commands):
+            command.revert(editor)
+            
+    def size(self):
+        return sum(command.size() for command in self.commands)
+        
+    def objects(self, editor):
+        return [entry for command in self.commands for entry in command.objects(editor)]
+
+
+class CommandHistory:
+    """Journal d'opérations annulables, borné par un budget mémoire.
+    
+    listener, s'il est défini, est appelé avec chaque opération appliquée,
+    annulée ou rétablie (sauvegarde automatique).
+    """
+    def __init__(self, budget=DEFAULT_HISTORY_BUDGET):
+        self.budget = budget
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.used = 0
+        self.listener = None
+        
+    def push(self, command):
+        """Enregistrer une opération déjà appliquée"""
+        command.cost = command.size()
+        self.undo_stack.append(command)
+        self.used += command.cost
+        for dropped in self.redo_stack:
+            self.used -= dropped.cost
+        self.redo_stack.clear()
+        # Oublier les opérations les plus anciennes au-delà du budget
+        while self.used > self.budget and len(self.undo_stack) > 1:
+            self.used -= self.undo_stack.popleft().cost
+        self._notify(command)
+            
+    def undo(self, editor):
+        if not self.undo_stack:
+            return False
+        command = self.undo_stack.pop()
+        command.revert(editor)
+        self.redo_stack.append(command)
+        self._notify(command)
+        return True
+        
+    def redo(self, editor):
+        if not self.redo_stack:
+            return False
+        command = self.redo_stack.pop()
+        command.apply(editor)
+        self.undo_stack.append(command)
+        self._notify(command)
+        return True
+        
+    def _notify(self, command):
+        if self.listener is not None:
+            self.listener(command)
+        
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.used = 0
+
+
+# === SAUVEGARDE AUTOMATIQUE ===
+
+# Journal de récupération, supprimé à la fermeture normale de l'application
+AUTOSAVE_PATH = os.path.join(os.path.expanduser("~"), ".pdf-create", "autosave.journal")
+# Période de vérification du texte et des réglages (ms)
+AUTOSAVE_INTERVAL_MS = 1000
+# Fenêtre de regroupement des écritures : un seul fsync par lot (secondes)
+AUTOSAVE_FSYNC_INTERVAL = 0.5
+# Nombre d'entrées au-delà duquel le journal est compacté en un instantané
+AUTOSAVE_COMPACT_ENTRIES = 2000
+
+# Champs du document hors objets (entrée 'settings' du journal)
+SETTINGS_KEYS = ('text', 'bg_color', 'text_color', 'font_family', 'font_size', 'text_align',
+                 'line_spacing', 'margins', 'page_format', 'canvas_size')
+
+
+class AutosaveJournal:
+    """Journal en ajout seul des modifications du document, écrit par un thread dédié.
+    
+    Chaque ligne est une entrée JSON idempotente : 'snapshot' (document
+    complet et identifiants des objets), 'put' (état et position d'un objet),
+    'delete' ou 'settings'. Le thread Tk ne fait que mettre les entrées en
+    file ; le thread d'écriture les regroupe et fait un seul fsync par lot.
+    Un instantané réécrit le journal dans un fichier temporaire qui remplace
+    l'ancien, ce qui le compacte.
+    """
+    _STOP = object()
+    
+    def __init__(self, path=AUTOSAVE_PATH, fsync_interval=AUTOSAVE_FSYNC_INTERVAL):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        # Entrées mises en file depuis le dernier instantané
+        self.entries = 0
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self.thread.start()
+        
+    def append(self, entry):
+        """Mettre une entrée en file (sérialisée par le thread d'écriture)"""
+        self.entries += 1
+        self.queue.put(entry)
+        
+    def snapshot(self, document, uids):
+        """Compacter le journal : document (listes d'objets copiées) et {kind: [uid]}"""
+        self.entries = 0
+        self.queue.put(('snapshot', document, uids))
+        
+    def close(self, discard=False):
+        """Écrire les entrées en attente et arrêter le thread ; discard supprime le journal"""
+        self.queue.put(self._STOP)
+        self.thread.join()
+        if discard:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+                
+    def _run(self):
+        f = None
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            # Regrouper ce qui arrive pendant la fenêtre : un seul fsync
+            deadline = time.monotonic() + self.fsync_interval
+            while batch[-1] is not self._STOP:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                lines = []
+                for entry in batch:
+                    if entry is self._STOP:
+                        running = False
+                    elif isinstance(entry, tuple):
+                        # Les entrées précédant l'instantané y sont déjà incluses
+                        lines = []
+                        f = self._write_snapshot(f, *entry[1:])
+                    else:
+                        lines.append(json.dumps(entry))
+                if lines:
+                    if f is None:
+                        f = self._open()
+                    f.write('\n'.join(lines) + '\n')
+                if f is not None:
+                    f.flush()
+                    os.fsync(f.fileno())
+            except Exception as e:
+                print(f"Erreur lors de la sauvegarde automatique: {e}")
+                if f is not None and f.closed:
+                    f = None
+        if f is not None:
+            f.close()
+            
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        return open(self.path, 'a', encoding='utf-8')
+        
+    def _write_snapshot(self, f, document, uids):
+        temp_path = self.path + '.tmp'
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(temp_path, 'w', encoding='utf-8') as snapshot:
+            json.dump({'op': 'snapshot', 'document': document.to_dict(), 'uids': uids}, snapshot)
+            snapshot.write('\n')
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        # En cas d'échec ci-dessus, l'ancien journal reste valide et continue d'être complété
+        if f is not None:
+            f.close()
+        os.replace(temp_path, self.path)
+        return self._open()
+
+
+def replay_journal(path=AUTOSAVE_PATH):
+    """Reconstruire le document d'un journal de sauvegarde automatique (None s'il est vide).
+    
+    La lecture s'arrête à la première ligne incomplète (écriture interrompue).
+    """
+    data = None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if entry['op'] == 'snapshot':
+                    data = entry['document']
+                    uids = {kind: list(entry['uids'][kind]) for kind in LAYER_KINDS}
+                elif data is None:
+                    continue
+                elif entry['op'] == 'settings':
+                    data.update(entry['settings'])
+                else:
+                    objects, kind_uids = data[entry['kind']], uids[entry['kind']]
+                    if entry['uid'] in kind_uids:
+                        index = kind_uids.index(entry['uid'])
+                        del objects[index]
+                        del kind_uids[index]
+                    if entry['op'] == 'put':
+                        index = min(entry['index'], len(objects))
+                        objects.insert(index, entry['object'])
+                        kind_uids.insert(index, entry['uid'])
+    except FileNotFoundError:
+        return None
+    return DocumentModel.from_dict(data) if data is not None else None
+
+
+# === CACHE D'IMAGES ===
+
+# Taille maximale des miniatures affichées sur le canvas
+THUMBNAIL_SIZE = (300, 300)
+# Budget mémoire par défaut du cache d'images décodées (octets)
+DEFAULT_IMAGE_CACHE_BYTES = 128 * 1024 * 1024
+
+
+class ImageCache:
+    """Cache LRU des miniatures décodées et de leurs PhotoImage, partagé par tout le processus.
+    
+    La clé (chemin, mtime, taille du fichier, taille de miniature) invalide
+    l'entrée dès que le fichier change sur le disque.
+    """
+    def __init__(self, max_bytes=DEFAULT_IMAGE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        
+    def _key(self, path, max_size):
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, tuple(max_size))
+        
+    def _entry(self, path, max_size):
+        key = self._key(path, max_size)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return key, entry
+            self.misses += 1
+            
+        # Décoder hors du verrou ; entrée = [miniature, PhotoImage, coût total en octets]
+        pil_image = PILImage.open(path)
+        pil_image.thumbnail(max_size, PILImage.Resampling.LANCZOS)
+        entry = [pil_image, None, pil_image.width * pil_image.height * len(pil_image.getbands())]
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = entry
+                self.used += entry[2]
+                self._evict()
+            return key, self.entries.get(key, entry)
+            
+    def _evict(self):
+        while self.used > self.max_bytes and len(self.entries) > 1:
+            _, entry = self.entries.popitem(last=False)
+            self.used -= entry[2]
+            
+    def get_thumbnail(self, path, max_size=THUMBNAIL_SIZE):
+        """Miniature PIL (utilisable sans Tk et depuis un autre thread)"""
+        return self._entry(path, max_size)[1][0]
+        
+    def get_photo(self, path, max_size=THUMBNAIL_SIZE):
+        """(miniature PIL, PhotoImage) ; à appeler depuis le thread Tk"""
+        key, entry = self._entry(path, max_size)
+        if entry[1] is None:
+            entry[1] = ImageTk.PhotoImage(entry[0])
+            with self.lock:
+                # Tk conserve sa propre copie des pixels : le coût de l'entrée
+                # les inclut, l'éviction retire donc bien tout ce qui a été compté
+                if self.entries.get(key) is entry:
+                    pixels = entry[0].width * entry[0].height * len(entry[0].getbands())
+                    entry[2] += pixels
+                    self.used += pixels
+                    self._evict()
+        return entry[0], entry[1]
+        
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'entries': len(self.entries), 'bytes': self.used}
+            
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.used = 0
+
+
+IMAGE_CACHE = ImageCache()
+
+
+def thumbnail_size(path, max_size=THUMBNAIL_SIZE):
+    """Taille de la miniature d'une image, lue dans son en-tête sans décoder les pixels"""
+    with PILImage.open(path) as pil_image:
+        width, height = pil_image.size
+    ratio = min(max_size[0] / width, max_size[1] / height, 1.0)
+    return (max(1, round(width * ratio)), max(1, round(height * ratio)))
+
+
+def decode_thumbnails(sources):
+    """Décoder des miniatures dans le cache (thread de préchargement)"""
+    for source in sources:
+        try:
+            IMAGE_CACHE.get_thumbnail(source)
+        except (OSError, ValueError):
+            # L'erreur sera signalée au moment du dessin
+            pass
+
+
+# === INDEX SPATIAL ===
+
+# Côté (en pixels) d'une case de la grille de l'index spatial
+SPATIAL_CELL_SIZE = 64
+# Tolérance (en pixels) des clics de sélection
+HIT_TOLERANCE = 4
+# Au-delà de ce nombre d'objets sélectionnés, un seul cadre est dessiné
+MAX_SELECTION_FRAMES = 500
+# Marge de préchargement autour de la zone visible (en fraction de sa taille)
+VIEWPORT_PREFETCH_MARGIN = 1.0
+# Au-delà de cette marge, les items canvas des objets sont détruits (le modèle reste intact)
+VIEWPORT_KEEP_MARGIN = 1.5
+# Nombre d'objets dessinés par tranche de préchargement, et délai entre deux tranches (ms)
+MATERIALIZE_BATCH = 300
+PREFETCH_DELAY_MS = 10
+
+_object_uids = itertools.count(1)
+
+
+def new_uid():
+    """Identifiant stable d'un objet du document (non sauvegardé)"""
+    return next(_object_uids)
+
+
+def object_bounds(kind, obj):
+    """Boîte englobante (x1, y1, x2, y2) d'un objet, calculée depuis le modèle"""
+    coords = obj['coords']
+    if kind == 'images':
+        x, y = coords[0], coords[1]
+        pil_image = obj.get('pil_image')
+        w, h = pil_image.size if pil_image is not None else obj.get('size', THUMBNAIL_SIZE)
+        return (x, y, x + w, y + h)
+    if kind == 'tables':
+        x, y = coords[0], coords[1]
+        return (x, y, x + obj['cols'] * obj['cell_width'], y + obj['rows'] * obj['cell_height'])
+    if obj['type'] == 'text':
+        # Estimation à partir de la taille de police (le canvas donne la valeur exacte)
+        x, y = coords[0], coords[1]
+        font_spec = obj.get('font', ('Arial', 12))
+        size = abs(int(font_spec[1])) if len(font_spec) > 1 else 12
+        lines = obj.get('text', '').split('\n')
+        return (x, y, x + max(len(line) for line in lines) * size * 0.8,
+                y + len(lines) * size * 1.6)
+    xs = coords[0::2]
+    ys = coords[1::2]
+    pad = obj.get('width', 2) / 2
+    return (min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad)
+
+
+def distance_to_polyline(x, y, coords):
+    """Distance d'un point à une polyligne [x1, y1, x2, y2, ...]"""
+    best = math.hypot(x - coords[0], y - coords[1])
+    for i in range(2, len(coords) - 1, 2):
+        ax, ay, bx, by = coords[i - 2], coords[i - 1], coords[i], coords[i + 1]
+        dx, dy = bx - ax, by - ay
+        length = dx * dx + dy * dy
+        t = 0 if length == 0 else max(0, min(1, ((x - ax) * dx + (y - ay) * dy) / length))
+        best = min(best, math.hypot(x - ax - t * dx, y - ay - t * dy))
+    return best
+
+
+class SpatialIndex:
+    """Grille uniforme de boîtes englobantes : requêtes par point et par zone.
+    
+    Chaque entrée est enregistrée dans toutes les cases que couvre sa boîte ;
+    une requête ne visite que les cases de la zone demandée, quel que soit
+    le nombre d'objets du document.
+    """
+    def __init__(self, cell_size=SPATIAL_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entries = {}
+        
+    def _cells(self, x1, y1, x2, y2):
+        size = self.cell_size
+        for cx in range(int(x1 // size), int(x2 // size) + 1):
+            for cy in range(int(y1 // size), int(y2 // size) + 1):
+                yield (cx, cy)
+                
+    def insert(self, key, bbox, value):
+        """Ajouter (ou remplacer) une entrée"""
+        if key in self.entries:
+            self.remove(key)
+        self.entries[key] = (bbox, value)
+        for cell in self._cells(*bbox):
+            self.cells.setdefault(cell, set()).add(key)
+            
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for cell in self._cells(*entry[0]):
+            keys = self.cells.get(cell)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.cells[cell]
+                    
+    def bbox(self, key):
+        entry = self.entries.get(key)
+        return entry[0] if entry else None
+        
+    def query_rect(self, x1, y1, x2, y2, contained=False):
+        """Valeurs dont la boîte touche (ou, si contained, est incluse dans) la zone"""
+        x1, x2 = min(x1, x2), max(x1, x2)
+        y1, y2 = min(y1, y2), max(y1, y2)
+        seen = set()
+        results = []
+        for cell in self._cells(x1, y1, x2, y2):
+            for key in self.cells.get(cell, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                (bx1, by1, bx2, by2), value = self.entries[key]
+                if contained:
+                    hit = x1 <= bx1 and bx2 <= x2 and y1 <= by1 and by2 <= y2
+                else:
+                    hit = bx1 <= x2 and x1 <= bx2 and by1 <= y2 and y1 <= by2
+                if hit:
+                    results.append(value)
+        return results
+        
+    def query_point(self, x, y, tolerance=0):
+        """Valeurs dont la boîte (élargie de tolerance) contient le point"""
+        return self.query_rect(x - tolerance, y - tolerance, x + tolerance, y + tolerance)
+        
+    def clear(self):
+        self.cells.clear()
+        self.entries.clear()
+        
+    def __len__(self):
+        return len(self.entries)
+
+
+# === TUILES RASTER (NIVEAU DE DÉTAIL) ===
+
+# Étendue (en unités du document, zoom 1) de la zone de défilement du canvas
+CANVAS_SIZE = 2000
+# Bornes et pas du zoom du canvas
+MIN_ZOOM = 0.1
+MAX_ZOOM = 8.0
+ZOOM_STEP = 1.25
+# En dessous de ce zoom, formes et tableaux sont affichés en tuiles raster
+LOD_ZOOM = 0.5
+# Types d'objets rendus en tuiles (un calque de tuiles par type)
+TILED_KINDS = ('shapes', 'tables')
+# Côté d'une tuile en pixels écran, nombre de tuiles gardées en cache, intervalle de scrutation (ms)
+TILE_PIXELS = 256
+TILE_CACHE_SIZE = 128
+TILE_POLL_MS = 30
+# Débord (en pixels écran) pris en compte autour d'une tuile pour les traits épais
+TILE_BLEED = 8
+
+
+def tile_rect(zoom, tx, ty):
+    """Zone du document (x1, y1, x2, y2) couverte par une tuile à ce zoom"""
+    size = TILE_PIXELS / zoom
+    return (tx * size, ty * size, (tx + 1) * size, (ty + 1) * size)
+
+
+def tile_snapshot(kind, obj):
+    """Copie des données d'un objet nécessaires au rendu d'une tuile (lue par le thread de rendu)"""
+    if kind == 'tables':
+        return ('table', tuple(obj['coords'][:2]), obj['rows'], obj['cols'],
+                obj['cell_width'], obj['cell_height'])
+    return (obj['type'], list(obj['coords']), obj['color'], obj.get('width', 2),
+            obj.get('text', ''), obj.get('font', ('Arial', 12)))
+
+
+def render_tile(zoom, tx, ty, snapshot):
+    """Rasteriser une tuile (thread de rendu) : image RGBA transparente de TILE_PIXELS de côté"""
+    image = PILImage.new('RGBA', (TILE_PIXELS, TILE_PIXELS), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    ox, oy = tx * TILE_PIXELS, ty * TILE_PIXELS
+    
+    def points(coords):
+        return [(x * zoom - ox, y * zoom - oy) for x, y in zip(coords[0::2], coords[1::2])]
+        
+    for entry in snapshot:
+        try:
+            if entry[0] == 'table':
+                _, (x, y), rows, cols, cell_width, cell_height = entry
+                x0, y0 = x * zoom - ox, y * zoom - oy
+                x1, y1 = x0 + cols * cell_width * zoom, y0 + rows * cell_height * zoom
+                draw.rectangle((x0, y0, x1, y1), fill="white", outline="black")
+                for i in range(1, rows):
+                    draw.line((x0, y0 + i * cell_height * zoom, x1, y0 + i * cell_height * zoom), fill="black")
+                for j in range(1, cols):
+                    draw.line((x0 + j * cell_width * zoom, y0, x0 + j * cell_width * zoom, y1), fill="black")
+                continue
+            shape_type, coords, color, width, text, font_spec = entry
+            width = max(1, round(width * zoom))
+            if shape_type in ('rectangle', 'circle'):
+                (xa, ya), (xb, yb) = points(coords[:4])
+                box = (min(xa, xb), min(ya, yb), max(xa, xb), max(ya, yb))
+                if shape_type == 'rectangle':
+                    draw.rectangle(box, outline=color, width=width)
+                else:
+                    draw.ellipse(box, outline=color, width=width)
+            elif shape_type == 'text':
+                size = max(1, round(abs(int(font_spec[1])) * zoom)) if len(font_spec) > 1 else 12
+                try:
+                    font = ImageFont.load_default(size)
+                except TypeError:
+                    # Pillow < 10.1 : police bitmap de taille fixe
+                    font = ImageFont.load_default()
+                draw.text(points(coords[:2])[0], text, fill=color, font=font)
+            else:
+                draw.line(points(coords), fill=color, width=width, joint="curve")
+        except ValueError:
+            # Couleur Tk inconnue de PIL : l'objet est omis de la tuile
+            pass
+    return image
+
+
+# === REGISTRE DES OBJETS ===
+
+# Écart minimal entre deux clés d'ordre voisines avant de les réespacer
+MIN_ORDER_GAP = 2 ** -20
+
+
+class ObjectRegistry:
+    """Correspondances item canvas -> objet et uid -> objet, et position des objets dans leurs listes.
+    
+    Chaque objet reçoit une clé d'ordre (un flottant) ; les clés d'une liste
+    sont conservées triées en parallèle de celle-ci, si bien que la position
+    d'un objet se retrouve par dichotomie au lieu d'un parcours de la liste.
+    Les listes d'objets ne doivent être modifiées qu'au travers du registre.
+    """
+    def __init__(self):
+        self.by_item = {}
+        self.by_uid = {}
+        self.keys = {}
+        self.order_keys = {}
+        self.listeners = []
+        
+    def subscribe(self, callback):
+        """callback(change, kind, index) après chaque modification d'une liste d'objets.
+        
+        change vaut 'insert', 'remove', 'move' (index = plus petite position
+        touchée), 'update' (propriétés modifiées) ou 'reset'.
+        """
+        self.listeners.append(callback)
+        
+    def _notify(self, change, kind=None, index=0):
+        for callback in self.listeners:
+            callback(change, kind, index)
+            
+    def register(self, kind, obj, items):
+        self.by_uid[obj['uid']] = (kind, obj)
+        for item in items:
+            self.by_item[item] = (kind, obj)
+            
+    def unregister(self, obj, items):
+        self.by_uid.pop(obj.get('uid'), None)
+        self.forget_items(items)
+        
+    def forget_items(self, items):
+        for item in items:
+            self.by_item.pop(item, None)
+            
+    def lookup_item(self, item):
+        """(kind, objet) propriétaire d'un item canvas, ou (None, None)"""
+        return self.by_item.get(item, (None, None))
+        
+    def lookup_uid(self, uid):
+        return self.by_uid.get(uid, (None, None))
+        
+    def _renumber(self, kind, objects):
+        keys = self.order_keys[kind] = [float(i) for i in range(len(objects))]
+        for key, obj in zip(keys, objects):
+            self.keys[obj['uid']] = key
+            
+    def insert(self, kind, objects, index, obj):
+        """Insérer un objet dans sa liste à la position donnée"""
+        self._insert(kind, objects, index, obj)
+        self._notify('insert', kind, index)
+        
+    def _insert(self, kind, objects, index, obj):
+        keys = self.order_keys.setdefault(kind, [])
+        if len(keys) != len(objects):
+            self._renumber(kind, objects)
+            keys = self.order_keys[kind]
+        if not keys:
+            key = 0.0
+        elif index >= len(keys):
+            key = keys[-1] + 1.0
+        elif index == 0:
+            key = keys[0] - 1.0
+        else:
+            key = (keys[index - 1] + keys[index]) / 2
+        objects.insert(index, obj)
+        keys.insert(index, key)
+        self.keys[obj['uid']] = key
+        if 0 < index < len(keys) - 1 and not (keys[index - 1] + MIN_ORDER_GAP < key < keys[index + 1] - MIN_ORDER_GAP):
+            self._respace(kind, objects, index)
+            
+    def _respace(self, kind, objects, index):
+        """Répartir régulièrement les clés autour de index quand les voisins sont trop serrés"""
+        keys = self.order_keys[kind]
+        span = 1
+        while True:
+            # Fenêtre doublée jusqu'à avoir assez de place entre ses bornes (exclues)
+            span *= 2
+            lo, hi = index - span, index + span
+            if lo < 0 and hi >= len(keys):
+                self._renumber(kind, objects)
+                return
+            low = keys[lo] if lo >= 0 else keys[0] - span
+            high = keys[hi] if hi < len(keys) else keys[-1] + span
+            lo, hi = max(lo, -1), min(hi, len(keys))
+            step = (high - low) / (hi - lo)
+            if step > MIN_ORDER_GAP * 4:
+                break
+        for i in range(lo + 1, hi):
+            keys[i] = low + (i - lo) * step
+            self.keys[objects[i]['uid']] = keys[i]
+            
+    def append(self, kind, objects, obj):
+        self.insert(kind, objects, len(objects), obj)
+        
+    def position(self, kind, objects, obj):
+        """Position d'un objet dans sa liste (comparaison par identité)"""
+        keys = self.order_keys.get(kind, [])
+        key = self.keys.get(obj.get('uid'))
+        if key is not None and len(keys) == len(objects):
+            index = bisect.bisect_left(keys, key)
+            if index < len(objects) and objects[index] is obj:
+                return index
+        for index, candidate in enumerate(objects):
+            if candidate is obj:
+                self._renumber(kind, objects)
+                return index
+        raise ValueError("Objet absent du document")
+        
+    def remove(self, kind, objects, obj):
+        """Retirer un objet de sa liste, retourne sa position"""
+        index = self.position(kind, objects, obj)
+        del objects[index]
+        del self.order_keys[kind][index]
+        self.keys.pop(obj['uid'], None)
+        self._notify('remove', kind, index)
+        return index
+        
+    def replace(self, kind, objects, new_objects):
+        """Remplacer tout le contenu d'une liste"""
+        objects[:] = new_objects
+        self._renumber(kind, objects)
+        self._notify('reset')
+        
+    def move(self, kind, objects, old_index, new_index):
+        """Déplacer un objet dans sa liste"""
+        obj = objects.pop(old_index)
+        del self.order_keys[kind][old_index]
+        self._insert(kind, objects, new_index, obj)
+        self._notify('move', kind, min(old_index, new_index))
+        
+    def touch(self, kind, objects, obj):
+        """Signaler la modification des propriétés d'un objet"""
+        self._notify('update', kind, self.position(kind, objects, obj))
+        
+    def clear(self):
+        self.by_item.clear()
+        self.by_uid.clear()
+        self.keys.clear()
+        self.order_keys.clear()
+        self._notify('reset')
+
+
+# === PANNEAU DES CALQUES ===
+
+LAYER_KINDS = ('shapes', 'images', 'tables')
+
+
+def layer_name(kind, index, obj):
+    """Libellé d'un objet dans le panneau des calques"""
+    if kind == 'shapes':
+        if obj['type'] == 'text' and 'text' in obj:
+            preview = obj['text'][:20] + "..." if len(obj['text']) > 20 else obj['text']
+            return f"Texte {index+1}: {preview}"
+        return f"Forme {index+1} ({obj['type']})"
+    if kind == 'images':
+        return f"Image {index+1}: {os.path.basename(obj['path'])}"
+    return f"Tableau {index+1} ({obj['rows']}x{obj['cols']})"
+
+
+class LayerPanel:
+    """Panneau des calques virtualisé : la Listbox ne contient que les lignes visibles.
+    
+    Les lignes sont numérotées comme les listes du document (formes, puis
+    images, puis tableaux) ; leurs libellés ne sont calculés qu'à l'affichage.
+    Les changements notifiés par le registre ne retouchent que la fenêtre
+    visible, une seule fois par passage de la boucle Tk.
+    """
+    def __init__(self, listbox, scrollbar, get_objects):
+        self.listbox = listbox
+        self.scrollbar = scrollbar
+        self.get_objects = get_objects
+        self.first = 0
+        self.visible_rows = int(listbox.cget('height'))
+        self.row_height = None
+        self.selected = None
+        self.pending = None
+        
+        scrollbar.configure(command=self.yview)
+        listbox.bind("<Configure>", self.on_configure)
+        listbox.bind("<<ListboxSelect>>", self.on_select)
+        listbox.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, 'units'))
+        listbox.bind("<Button-4>", lambda e: self.scroll(-1, 'units'))
+        listbox.bind("<Button-5>", lambda e: self.scroll(1, 'units'))
+        listbox.bind("<Up>", lambda e: self.step_selection(-1))
+        listbox.bind("<Down>", lambda e: self.step_selection(1))
+        
+    def row_count(self):
+        return sum(len(self.get_objects(kind)) for kind in LAYER_KINDS)
+        
+    def row_of(self, kind, index):
+        """Ligne du panneau d'un objet (kind, position dans sa liste)"""
+        for other in LAYER_KINDS:
+            if other == kind:
+                return index
+            index += len(self.get_objects(other))
+            
+    def row_object(self, row):
+        """(kind, position dans la liste) d'une ligne du panneau"""
+        for kind in LAYER_KINDS:
+            count = len(self.get_objects(kind))
+            if row < count:
+                return kind, row
+            row -= count
+        return None, None
+        
+    def row_name(self, row):
+        kind, index = self.row_object(row)
+        return layer_name(kind, index, self.get_objects(kind)[index])
+        
+    # Notifications du registre
+    
+    def on_change(self, change, kind, index):
+        if change == 'reset':
+            self.first = 0
+            self.selected = None
+            self.schedule()
+            return
+        row = self.row_of(kind, index)
+        if change == 'update':
+            if self.pending is None and self.first <= row < self.first + self.visible_rows:
+                self.rename(row)
+            return
+        # Insertion, suppression ou déplacement : la sélection suit son objet
+        if self.selected is not None and change != 'move' and row <= self.selected:
+            self.selected += 1 if change == 'insert' else -1
+            if self.selected < row:
+                self.selected = None
+        if row < self.first + self.visible_rows:
+            self.schedule()
+        else:
+            self.update_scrollbar()
+            
+    def schedule(self):
+        if self.pending is None:
+            self.pending = self.listbox.after_idle(self.render)
+            
+    # Affichage
+    
+    def render(self):
+        """Redessiner les lignes visibles"""
+        self.pending = None
+        total = self.row_count()
+        self.first = max(0, min(self.first, total - self.visible_rows))
+        last = min(total, self.first + self.visible_rows)
+        self.listbox.delete(0, tk.END)
+        if last > self.first:
+            self.listbox.insert(0, *[self.row_name(row) for row in range(self.first, last)])
+        if self.selected is not None and self.first <= self.selected < last:
+            self.listbox.selection_set(self.selected - self.first)
+        self.update_scrollbar(total)
+        
+    def rename(self, row):
+        local = row - self.first
+        self.listbox.delete(local)
+        self.listbox.insert(local, self.row_name(row))
+        if self.selected == row:
+            self.listbox.selection_set(local)
+            
+    def update_scrollbar(self, total=None):
+        total = self.row_count() if total is None else total
+        if total <= self.visible_rows:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.first / total, (self.first + self.visible_rows) / total)
+            
+    def on_configure(self, event):
+        if self.row_height is None:
+            self.row_height = font.Font(font=self.listbox.cget('font')).metrics('linespace') + 1
+        rows = max(1, event.height // self.row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.schedule()
+            
+    def yview(self, *args):
+        """Commande de la barre de défilement"""
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * self.row_count()))
+        elif args[0] == 'scroll':
+            self.scroll(int(args[1]), args[2])
+            
+    def scroll(self, amount, what='units'):
+        step = self.visible_rows if what == 'pages' else 1
+        self.scroll_to(self.first + amount * step)
+        return "break"
+        
+    def scroll_to(self, first):
+        first = max(0, min(first, self.row_count() - self.visible_rows))
+        if first != self.first:
+            self.first = first
+            self.schedule()
+            
+    # Sélection
+    
+    def on_select(self, event=None):
+        current = self.listbox.curselection()
+        if current:
+            self.selected = self.first + current[0]
+            
+    def selected_row(self):
+        self.on_select()
+        if self.selected is not None and self.selected < self.row_count():
+            return self.selected
+        return None
+        
+    def step_selection(self, step):
+        """Flèches haut/bas : déplacer la sélection en faisant défiler si besoin"""
+        row = self.selected_row()
+        row = 0 if row is None else max(0, min(row + step, self.row_count() - 1))
+        self.select_row(row)
+        return "break"
+        
+    def select_row(self, row):
+        """Sélectionner une ligne et la faire défiler dans la fenêtre visible"""
+        self.selected = row
+        if not self.first <= row < self.first + self.visible_rows:
+            self.first = max(0, row - self.visible_rows // 2)
+        self.schedule()
+
 
 class AdvancedPDFEditor:
     def __init__(self, root):
@@ -26,6 +2495,7 @@ class AdvancedPDFEditor:
         self.setup_styles()
         self.create_gui()
         self.bind_events()
+        self.start_autosave()
         
     def setup_styles(self):
         self.colors = {
@@ -65,22 +2535,63 @@ class AdvancedPDFEditor:
         self.start_y = None
         self.current_shape = None
         
-        self.undo_stack = []
-        self.redo_stack = []
+        # Historique d'opérations (annuler/rétablir), borné en mémoire
+        self.history = CommandHistory(DEFAULT_HISTORY_BUDGET)
+        self.history.listener = self.journal_command
+        
+        # Sauvegarde automatique (journal écrit par un thread) et dernier état des réglages journalisé
+        self.journal = None
+        self.journal_settings = None
+        self.autosave_job = None
         
         # Variables pour le canvas unifié
         self.is_drawing = False
         self.last_x = None
         self.last_y = None
+        self.current_stroke = None
         self.current_text_item = None
         self.text_entries = {}
-        self.selected_item = None
+        self.drag_target = None
+        self.drag_last = None
+        self.drag_delta = (0, 0)
+        
+        # Sélection (liste de (kind, objet)) et index spatial des objets du canvas
+        self.selection = []
+        self.selected_uids = set()
+        self.spatial_index = SpatialIndex()
+        self.registry = ObjectRegistry()
+        self.band_start = None
+        self.band_end = None
+        self.band_item = None
+        
+        # Objets dessinés sur le canvas, par type et dans l'ordre du document ;
+        # les autres ne sont matérialisés qu'en entrant dans la zone visible
+        self.drawn = {kind: [] for kind in LAYER_KINDS}
+        self.drawn_uids = set()
+        self.viewport_job = None
+        self.prefetch_queue = deque()
+        self.prefetch_job = None
+        self.prefetch_executor = ThreadPoolExecutor(max_workers=1)
+        
+        # Export PDF en cours (un seul à la fois), rendu par un thread dédié
+        self.export_job = None
+        self.export_executor = ThreadPoolExecutor(max_workers=1)
+        
+        # Zoom du canvas ; en dessous de LOD_ZOOM, tuiles raster (calque, zoom, tx, ty) -> PhotoImage
+        self.zoom = 1.0
+        self.tile_cache = OrderedDict()
+        self.tile_jobs = {}
+        self.tile_items = {}
+        self.tile_photos = {}
+        self.tile_poll_job = None
         
         # Variables pour le mode d'édition
         self.edit_mode = tk.StringVar(value="text")
         self.text_font_var = tk.StringVar(value="Arial")
         self.text_size_var = tk.StringVar(value="12")
         self.brush_size_var = tk.StringVar(value="2")
+        # Tolérance (en pixels) de simplification des tracés à main levée
+        self.stroke_tolerance_var = tk.StringVar(value="1.0")
         
         # Variables pour les combobox
         self.font_var = tk.StringVar(value="Helvetica")
@@ -111,7 +2622,7 @@ class AdvancedPDFEditor:
         file_menu.add_command(label="Exporter PDF", command=self.export_pdf, accelerator="Ctrl+E")
         file_menu.add_command(label="Aperçu", command=self.preview_pdf, accelerator="Ctrl+P")
         file_menu.add_separator()
-        file_menu.add_command(label="Quitter", command=self.root.quit, accelerator="Ctrl+Q")
+        file_menu.add_command(label="Quitter", command=self.quit_app, accelerator="Ctrl+Q")
         
         edit_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Édition", menu=edit_menu)
@@ -136,6 +2647,9 @@ class AdvancedPDFEditor:
         self.root.bind('<Control-p>', lambda e: self.preview_pdf())
         self.root.bind('<Control-z>', lambda e: self.undo())
         self.root.bind('<Control-y>', lambda e: self.redo())
+        self.root.bind('<Control-plus>', lambda e: self.zoom_in())
+        self.root.bind('<Control-equal>', lambda e: self.zoom_in())
+        self.root.bind('<Control-minus>', lambda e: self.zoom_out())
         
     def create_toolbar(self):
         toolbar_frame = tk.Frame(self.root, bg=self.colors['dark'], height=80)
@@ -297,6 +2811,10 @@ class AdvancedPDFEditor:
                               variable=self.brush_size_var, length=80)
         brush_scale.pack(side="left", padx=2)
         
+        tk.Label(draw_tools_frame, text="Lissage:", bg=self.colors['light']).pack(side="left", padx=2)
+        tk.Spinbox(draw_tools_frame, from_=0, to=10, increment=0.5, width=4,
+                  textvariable=self.stroke_tolerance_var).pack(side="left", padx=2)
+        
         tk.Button(draw_tools_frame, text="🗑️", command=self.clear_canvas, width=3, height=1).pack(side="left", padx=2)
         
         # Canvas principal
@@ -310,7 +2828,8 @@ class AdvancedPDFEditor:
         v_scrollbar = tk.Scrollbar(canvas_container, orient="vertical", command=self.canvas.yview)
         h_scrollbar = tk.Scrollbar(canvas_container, orient="horizontal", command=self.canvas.xview)
         
-        self.canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.canvas.configure(yscrollcommand=lambda *args: self.on_view_change(v_scrollbar, *args),
+                              xscrollcommand=lambda *args: self.on_view_change(h_scrollbar, *args))
         
         # Grid layout
         self.canvas.grid(row=0, column=0, sticky="nsew")
@@ -321,7 +2840,7 @@ class AdvancedPDFEditor:
         canvas_container.grid_columnconfigure(0, weight=1)
         
         # Configuration de la zone de défilement
-        self.canvas.configure(scrollregion=(0, 0, 2000, 2000))
+        self.canvas.configure(scrollregion=(0, 0, CANVAS_SIZE, CANVAS_SIZE))
         
         # Curseur par défaut
         self.canvas.configure(cursor="xterm")
@@ -352,7 +2871,7 @@ class AdvancedPDFEditor:
         text_container.pack(fill="both", expand=True, padx=5, pady=5)
         
         self.text_widget = tk.Text(text_container, wrap=tk.WORD, font=(self.font_family, self.font_size),
-                                  bg="white", fg=self.text_color, relief="sunken", bd=2)
+                                  bg="white", fg=self.text_color, relief="sunken", bd=2, undo=True)
         
         text_v_scrollbar = tk.Scrollbar(text_container, orient="vertical", command=self.text_widget.yview)
         text_h_scrollbar = tk.Scrollbar(text_container, orient="horizontal", command=self.text_widget.xview)
@@ -368,7 +2887,7 @@ class AdvancedPDFEditor:
         text_container.grid_columnconfigure(0, weight=1)
         
         # Texte d'exemple
-        self.text_widget.insert("1.0", "Commencez à taper votre texte ici...\n\nUtilisez les outils pour formater votre document.")
+        self.text_widget.insert("1.0", DEFAULT_TEXT)
         
     def create_properties_panel(self):
         properties_frame = tk.Frame(self.root, bg=self.colors['light'], width=300)
@@ -422,8 +2941,17 @@ class AdvancedPDFEditor:
                                    fg=self.colors['dark'], font=('Arial', 10, 'bold'))
         layer_frame.pack(fill="both", expand=True, padx=10, pady=5)
         
-        self.layer_listbox = tk.Listbox(layer_frame, bg='white', height=8)
-        self.layer_listbox.pack(fill="both", expand=True, padx=5, pady=5)
+        list_container = tk.Frame(layer_frame, bg=self.colors['light'])
+        list_container.pack(fill="both", expand=True, padx=5, pady=5)
+        
+        self.layer_listbox = tk.Listbox(list_container, bg='white', height=8, exportselection=False)
+        layer_scrollbar = tk.Scrollbar(list_container, orient="vertical")
+        self.layer_listbox.pack(side="left", fill="both", expand=True)
+        layer_scrollbar.pack(side="right", fill="y")
+        
+        # Seules les lignes visibles sont créées ; le registre notifie les changements
+        self.layer_panel = LayerPanel(self.layer_listbox, layer_scrollbar, lambda kind: getattr(self, kind))
+        self.registry.subscribe(self.layer_panel.on_change)
         
         layer_buttons = tk.Frame(layer_frame, bg=self.colors['light'])
         layer_buttons.pack(fill="x", padx=5, pady=5)
@@ -437,6 +2965,9 @@ class AdvancedPDFEditor:
         self.status_bar = tk.Label(self.root, text="Prêt", bg=self.colors['dark'], 
                                   fg=self.colors['light'], relief="sunken", anchor="w")
         self.status_bar.pack(side="bottom", fill="x")
+        # Affiché dans la barre de statut pendant un export
+        self.cancel_export_button = tk.Button(self.status_bar, text="Annuler l'export",
+                                              command=self.cancel_export, padx=8, pady=0)
         
     def bind_events(self):
         # Événements du canvas
@@ -445,6 +2976,11 @@ class AdvancedPDFEditor:
         self.canvas.bind("<ButtonRelease-1>", self.on_canvas_release)
         self.canvas.bind("<Motion>", self.on_canvas_motion)
         self.canvas.bind("<Double-Button-1>", self.on_canvas_double_click)
+        self.canvas.bind("<Configure>", lambda e: self.schedule_viewport_refresh())
+        # Ctrl + molette : zoom centré sur le curseur
+        self.canvas.bind("<Control-MouseWheel>", lambda e: self.zoom_at(e.delta > 0, e.x, e.y))
+        self.canvas.bind("<Control-Button-4>", lambda e: self.zoom_at(True, e.x, e.y))
+        self.canvas.bind("<Control-Button-5>", lambda e: self.zoom_at(False, e.x, e.y))
         
         # Raccourcis pour changer de mode
         self.root.bind("<Control-t>", lambda e: self.edit_mode.set("text") or self.change_edit_mode())
@@ -454,6 +2990,13 @@ class AdvancedPDFEditor:
         # Supprimer avec Delete
         self.root.bind("<Delete>", self.delete_selected)
         
+        # Le texte principal utilise l'historique natif du widget Text
+        self.text_widget.bind("<Control-z>", self.undo_text)
+        self.text_widget.bind("<Control-y>", self.redo_text)
+        
+        # Fermeture normale : le journal de sauvegarde automatique est supprimé
+        self.root.protocol("WM_DELETE_WINDOW", self.quit_app)
+        
     # === MÉTHODES D'INTERACTION CANVAS ===
     
     def change_edit_mode(self):
@@ -479,9 +3022,12 @@ class AdvancedPDFEditor:
                 btn.configure(bg=self.colors['light'], fg='black')
         self.update_status(f"Outil sélectionné: {tool}")
         
+    def event_point(self, event):
+        """Position d'un événement souris en coordonnées du document"""
+        return self.canvas.canvasx(event.x) / self.zoom, self.canvas.canvasy(event.y) / self.zoom
+        
     def on_canvas_click(self, event):
-        x = self.canvas.canvasx(event.x)
-        y = self.canvas.canvasy(event.y)
+        x, y = self.event_point(event)
         
         mode = self.edit_mode.get()
         
@@ -490,7 +3036,10 @@ class AdvancedPDFEditor:
         elif mode == "draw":
             self.start_drawing(x, y)
         elif mode == "select":
-            self.select_item(x, y)
+            if self.select_item(x, y):
+                self.start_drag(x, y)
+            else:
+                self.start_band(x, y)
         elif self.current_tool == "image":
             self.add_image_at_position(x, y)
         elif self.current_tool == "table":
@@ -501,71 +3050,71 @@ class AdvancedPDFEditor:
             self.drawing = True
             
     def on_canvas_drag(self, event):
-        x = self.canvas.canvasx(event.x)
-        y = self.canvas.canvasy(event.y)
+        x, y = self.event_point(event)
         
         mode = self.edit_mode.get()
         
         if mode == "draw" and self.is_drawing:
             self.continue_drawing(x, y)
+        elif mode == "select" and self.drag_target:
+            self.continue_drag(x, y)
+        elif mode == "select" and self.band_start:
+            self.continue_band(x, y)
         elif self.drawing and self.current_tool in ["rectangle", "circle", "line"]:
             if self.current_shape:
                 self.canvas.delete(self.current_shape)
             
+            coords = scale_coords([self.start_x, self.start_y, x, y], self.zoom)
+            width = int(self.brush_size_var.get()) * self.zoom
             if self.current_tool == "rectangle":
                 self.current_shape = self.canvas.create_rectangle(
-                    self.start_x, self.start_y, x, y, 
-                    outline=self.text_color, width=int(self.brush_size_var.get()))
+                    *coords, outline=self.text_color, width=width)
             elif self.current_tool == "circle":
                 self.current_shape = self.canvas.create_oval(
-                    self.start_x, self.start_y, x, y, 
-                    outline=self.text_color, width=int(self.brush_size_var.get()))
+                    *coords, outline=self.text_color, width=width)
             elif self.current_tool == "line":
                 self.current_shape = self.canvas.create_line(
-                    self.start_x, self.start_y, x, y, 
-                    fill=self.text_color, width=int(self.brush_size_var.get()))
+                    *coords, fill=self.text_color, width=width)
                     
     def on_canvas_release(self, event):
         mode = self.edit_mode.get()
         
         if mode == "draw":
             self.stop_drawing()
+        elif mode == "select":
+            self.stop_drag()
+            self.stop_band()
         elif self.drawing:
             self.drawing = False
             if self.current_shape:
-                coords = self.canvas.coords(self.current_shape)
-                self.shapes.append({
-                    'type': self.current_tool,
-                    'coords': coords,
-                    'color': self.text_color,
-                    'width': int(self.brush_size_var.get()),
-                    'id': self.current_shape
-                })
-                self.update_layer_list()
-                self.save_state()
+                coords = [c / self.zoom for c in self.canvas.coords(self.current_shape)]
+                self.add_object('shapes', ShapeRecord(
+                    self.current_tool, coords, self.text_color,
+                    width=int(self.brush_size_var.get()),
+                    id=self.current_shape
+                ))
             self.current_shape = None
             
     def on_canvas_motion(self, event):
-        x = self.canvas.canvasx(event.x)
-        y = self.canvas.canvasy(event.y)
+        x, y = self.event_point(event)
         self.update_status(f"Position: ({int(x)}, {int(y)})")
         
     def on_canvas_double_click(self, event):
-        x = self.canvas.canvasx(event.x)
-        y = self.canvas.canvasy(event.y)
+        x, y = self.event_point(event)
         
         # Double-clic pour éditer du texte existant
-        item = self.canvas.find_closest(x, y)[0]
-        if item and self.canvas.type(item) == "text":
-            self.edit_text_item(item, x, y)
+        hit = self.hit_test(x, y)
+        if hit and hit[0] == 'shapes' and hit[1]['type'] == 'text' and hit[1].get('id'):
+            self.edit_text_item(hit[1]['id'], x, y)
     
     # === MÉTHODES DE CRÉATION D'ÉLÉMENTS ===
     
     def add_text_directly(self, x, y):
         # Créer une zone de saisie temporaire
-        entry = tk.Entry(self.canvas, font=(self.text_font_var.get(), int(self.text_size_var.get())), 
+        font_spec = (self.text_font_var.get(), int(self.text_size_var.get()))
+        entry = tk.Entry(self.canvas, font=scale_font(font_spec, self.zoom), 
                         bg="white", fg=self.text_color, relief="solid", bd=1)
-        entry_window = self.canvas.create_window(x, y, window=entry, anchor="nw")
+        entry_window = self.canvas.create_window(x * self.zoom, y * self.zoom, window=entry, anchor="nw")
         
         entry.focus_set()
         
@@ -573,19 +3122,15 @@ class AdvancedPDFEditor:
             text = entry.get()
             if text.strip():
                 self.canvas.delete(entry_window)
-                text_id = self.canvas.create_text(x, y, text=text, 
-                                                font=(self.text_font_var.get(), int(self.text_size_var.get())),
+                text_id = self.canvas.create_text(x * self.zoom, y * self.zoom, text=text, 
+                                                font=scale_font(font_spec, self.zoom),
                                                 fill=self.text_color, anchor="nw")
-                self.shapes.append({
-                    'type': 'text',
-                    'coords': [x, y],
-                    'text': text,
-                    'font': (self.text_font_var.get(), int(self.text_size_var.get())),
-                    'color': self.text_color,
-                    'id': text_id
-                })
-                self.update_layer_list()
-                self.save_state()
+                self.add_object('shapes', ShapeRecord(
+                    'text', [x, y], self.text_color,
+                    text=text,
+                    font=font_spec,
+                    id=text_id
+                ))
             else:
                 self.canvas.delete(entry_window)
                 
@@ -618,19 +3163,17 @@ class AdvancedPDFEditor:
         entry.insert(0, current_text)
         entry.select_range(0, tk.END)
         
-        entry_window = self.canvas.create_window(x, y, window=entry, anchor="nw")
+        entry_window = self.canvas.create_window(x * self.zoom, y * self.zoom, window=entry, anchor="nw")
         entry.focus_set()
         
         def on_edit_return(event):
             new_text = entry.get()
-            if new_text.strip():
-                self.canvas.itemconfig(item, text=new_text)
-                # Mettre à jour dans la liste des shapes
-                for shape in self.shapes:
-                    if shape.get('id') == item:
-                        shape['text'] = new_text
-                        break
-                self.save_state()
+            kind, shape = self.find_object(item)
+            if new_text.strip() and shape is not None and shape.get('text') != new_text:
+                # Mettre à jour la forme et l'historique
+                old_text = shape.get('text')
+                self.update_object(kind, shape, {'text': new_text})
+                self.history.push(ModifyCommand(kind, shape, {'text': old_text}, {'text': new_text}))
             self.canvas.delete(entry_window)
             
         def on_edit_escape(event):
@@ -646,19 +3189,22 @@ class AdvancedPDFEditor:
         self.last_y = y
         
     def continue_drawing(self, x, y):
-        if self.last_x and self.last_y:
-            line_id = self.canvas.create_line(self.last_x, self.last_y, x, y, 
-                                            fill=self.text_color, 
-                                            width=int(self.brush_size_var.get()),
-                                            capstyle=tk.ROUND, 
-                                            smooth=True)
-            self.shapes.append({
-                'type': 'freehand',
-                'coords': [self.last_x, self.last_y, x, y],
-                'color': self.text_color,
-                'width': int(self.brush_size_var.get()),
-                'id': line_id
-            })
+        if self.last_x is not None and self.last_y is not None:
+            if self.current_stroke is None:
+                # Un tracé = une seule polyligne, complétée à chaque mouvement
+                line_id = self.canvas.create_line(*scale_coords([self.last_x, self.last_y, x, y], self.zoom), 
+                                                fill=self.text_color, 
+                                                width=int(self.brush_size_var.get()) * self.zoom,
+                                                capstyle=tk.ROUND, joinstyle=tk.ROUND,
+                                                smooth=True)
+                self.current_stroke = ShapeRecord(
+                    'freehand', [self.last_x, self.last_y, x, y], self.text_color,
+                    width=int(self.brush_size_var.get()),
+                    id=line_id
+                )
+            else:
+                self.current_stroke['coords'].extend((x, y))
+                self.canvas.insert(self.current_stroke['id'], tk.END, (x * self.zoom, y * self.zoom))
         self.last_x = x
         self.last_y = y
         
@@ -666,53 +3212,111 @@ class AdvancedPDFEditor:
         self.is_drawing = False
         self.last_x = None
         self.last_y = None
-        if self.shapes:
-            self.update_layer_list()
-            self.save_state()
+        stroke = self.current_stroke
+        self.current_stroke = None
+        if stroke:
+            stroke['coords'] = simplify_polyline(stroke['coords'], self.get_stroke_tolerance())
+            self.canvas.coords(stroke['id'], *scale_coords(stroke['coords'], self.zoom))
+            self.add_object('shapes', stroke)
+            
+    def get_stroke_tolerance(self):
+        try:
+            return max(0.0, float(self.stroke_tolerance_var.get()))
+        except ValueError:
+            return 1.0
             
     def select_item(self, x, y):
-        # Déselectionner l'item précédent
-        if self.selected_item:
-            try:
-                self.canvas.itemconfig(self.selected_item, outline="")
-            except:
-                pass
+        """Sélectionner l'objet sous le curseur, retourne (kind, objet) ou None"""
+        hit = self.hit_test(x, y)
+        if hit is None:
+            self.set_selection([])
+            return None
+        # Cliquer dans une sélection multiple la conserve (pour la déplacer)
+        if hit[1]['uid'] not in self.selected_uids:
+            self.set_selection([hit])
+        self.update_status(f"Item sélectionné: {hit[0]}")
+        return hit
+        
+    def hit_test(self, x, y):
+        """Objet le plus proche du point (kind, objet), ou None"""
+        best = None
+        # Tolérance exprimée en pixels écran
+        tolerance = HIT_TOLERANCE / self.zoom
+        for kind, obj in self.spatial_index.query_point(x, y, tolerance):
+            x1, y1, x2, y2 = self.spatial_index.bbox(obj['uid'])
+            if kind == 'shapes' and obj['type'] in ('line', 'freehand'):
+                distance = distance_to_polyline(x, y, obj['coords']) - obj.get('width', 2) / 2
+            else:
+                distance = math.hypot(max(x1 - x, 0, x - x2), max(y1 - y, 0, y - y2))
+            if distance > tolerance:
+                continue
+            # À distance égale, le plus petit objet puis le plus récent l'emportent
+            rank = (max(distance, 0), (x2 - x1) * (y2 - y1), -obj['uid'])
+            if best is None or rank < best[0]:
+                best = (rank, (kind, obj))
+        return best[1] if best else None
+        
+    def objects_in_region(self, x1, y1, x2, y2, contained=False):
+        """Objets (kind, objet) qui touchent la zone, ou y sont entièrement inclus"""
+        return self.spatial_index.query_rect(x1, y1, x2, y2, contained)
+        
+    def set_selection(self, selection):
+        """Remplacer la sélection courante"""
+        self.selection = list(selection)
+        self.selected_uids = {obj['uid'] for _, obj in self.selection}
+        self.draw_selection()
+        
+    def draw_selection(self):
+        """Dessiner les cadres de sélection"""
+        self.canvas.delete("selection")
+        boxes = [(obj['uid'], self.spatial_index.bbox(obj['uid'])) for _, obj in self.selection]
+        if len(boxes) > MAX_SELECTION_FRAMES:
+            # Au-delà, un seul cadre englobant toute la sélection
+            boxes = [(None, (min(b[0] for _, b in boxes), min(b[1] for _, b in boxes),
+                             max(b[2] for _, b in boxes), max(b[3] for _, b in boxes)))]
+        for uid, box in boxes:
+            x1, y1, x2, y2 = scale_coords(box, self.zoom)
+            tags = ("selection", f"selection-{uid}") if uid else "selection"
+            self.canvas.create_rectangle(x1 - 2, y1 - 2, x2 + 2, y2 + 2,
+                                       outline=self.colors['primary'], width=2,
+                                       dash=(4, 2), tags=tags)
             
-        # Trouver l'item le plus proche
-        item = self.canvas.find_closest(x, y)[0]
-        if item:
-            self.selected_item = item
-            # Mettre en évidence l'item sélectionné
-            try:
-                if self.canvas.type(item) in ["rectangle", "oval", "line"]:
-                    self.canvas.itemconfig(item, outline=self.colors['primary'], width=3)
-                elif self.canvas.type(item) == "text":
-                    bbox = self.canvas.bbox(item)
-                    if bbox:
-                        x1, y1, x2, y2 = bbox
-                        self.canvas.create_rectangle(x1-2, y1-2, x2+2, y2+2, 
-                                                   outline=self.colors['primary'], 
-                                                   width=2, tags="selection")
-            except:
-                pass
-            self.update_status(f"Item sélectionné: {item}")
+    def start_band(self, x, y):
+        """Commencer une sélection par zone (rectangle élastique)"""
+        self.band_start = self.band_end = (x, y)
+        self.band_item = self.canvas.create_rectangle(x * self.zoom, y * self.zoom, x * self.zoom, y * self.zoom,
+                                                      outline=self.colors['primary'],
+                                                      dash=(2, 2), tags="rubberband")
+        
+    def continue_band(self, x, y):
+        self.band_end = (x, y)
+        self.canvas.coords(self.band_item, *scale_coords([*self.band_start, x, y], self.zoom))
+        
+    def stop_band(self):
+        if not self.band_start:
+            return
+        (x1, y1), (x2, y2) = self.band_start, self.band_end
+        self.canvas.delete(self.band_item)
+        self.band_start = None
+        self.band_item = None
+        if x1 != x2 and y1 != y2:
+            self.set_selection(self.objects_in_region(x1, y1, x2, y2, contained=True))
+            self.update_status(f"{len(self.selection)} objet(s) sélectionné(s)")
             
     def delete_selected(self, event=None):
-        if self.selected_item:
-            # Supprimer les marqueurs de sélection
-            self.canvas.delete("selection")
-            
-            # Supprimer l'item
-            self.canvas.delete(self.selected_item)
+        if self.selection:
+            # Du dernier au premier, pour que les positions restantes restent valides
+            selection = sorted(self.selection, key=lambda entry: self.index_of(*entry), reverse=True)
+            self.set_selection([])
             
-            # Supprimer de la liste des shapes
-            self.shapes = [s for s in self.shapes if s.get('id') != self.selected_item]
-            self.images = [i for i in self.images if i.get('id') != self.selected_item]
+            # Supprimer les objets du document
+            commands = []
+            for kind, obj in selection:
+                index = self.remove_object(kind, obj)
+                commands.append(DeleteCommand(kind, obj, index))
+            self.history.push(commands[0] if len(commands) == 1 else BatchCommand(commands))
             
-            self.selected_item = None
-            self.update_layer_list()
-            self.save_state()
-            self.update_status("Item supprimé")
+            self.update_status("Item supprimé" if len(commands) == 1 else f"{len(commands)} items supprimés")
             
     def add_image_at_position(self, x, y):
         file_path = filedialog.askopenfilename(
@@ -721,26 +3325,18 @@ class AdvancedPDFEditor:
         )
         if file_path:
             try:
-                # Utiliser PIL pour redimensionner l'image si nécessaire
-                pil_image = PILImage.open(file_path)
-                
-                # Redimensionner si l'image est trop grande
-                max_size = (300, 300)
-                pil_image.thumbnail(max_size, PILImage.Resampling.LANCZOS)
+                # Miniature et PhotoImage partagées via le cache d'images
+                pil_image, img = IMAGE_CACHE.get_photo(file_path)
                 
-                # Convertir pour Tkinter
-                img = ImageTk.PhotoImage(pil_image)
-                
-                img_id = self.canvas.create_image(x, y, image=img, anchor="nw")
-                self.images.append({
+                image = {
                     'path': file_path,
                     'coords': [x, y],
-                    'image': img,
-                    'id': img_id,
+                    'image': img if self.zoom == 1.0 else None,
+                    'id': None,
                     'pil_image': pil_image
-                })
-                self.update_layer_list()
-                self.save_state()
+                }
+                self.redraw_image(image)
+                self.add_object('images', image)
                 self.update_status(f"Image ajoutée: {os.path.basename(file_path)}")
             except Exception as e:
                 messagebox.showerror("Erreur", f"Impossible de charger l'image: {e}")
@@ -748,44 +3344,36 @@ class AdvancedPDFEditor:
     def add_table_at_position(self, x, y):
         dialog = TableDialog(self.root)
         if dialog.result:
-            rows, cols = dialog.result
-            table_data = [[''] * cols for _ in range(rows)]
-            
-            cell_width = 80
-            cell_height = 30
-            
-            table_items = []
+            rows, cols, source = dialog.result
+            if source:
+                # Tableau lié : le canvas n'affiche que l'en-tête et les premières lignes
+                try:
+                    columns, preview = read_table_source(source, rows - 1)
+                except Exception as e:
+                    messagebox.showerror("Erreur", f"Impossible de lire la source: {e}")
+                    return
+                table_data = [columns] + preview
+                rows, cols = len(table_data), len(columns)
+            else:
+                table_data = [[''] * cols for _ in range(rows)]
             
-            for i in range(rows):
-                for j in range(cols):
-                    cell_x = x + j * cell_width
-                    cell_y = y + i * cell_height
-                    
-                    rect_id = self.canvas.create_rectangle(
-                        cell_x, cell_y, cell_x + cell_width, cell_y + cell_height,
-                        outline="black", fill="white", tags=f"table_{len(self.tables)}"
-                    )
-                    
-                    text_id = self.canvas.create_text(
-                        cell_x + cell_width//2, cell_y + cell_height//2,
-                        text=f"Cellule {i+1},{j+1}", font=("Arial", 9),
-                        tags=f"table_{len(self.tables)}"
-                    )
-                    
-                    table_items.extend([rect_id, text_id])
-                    
-            self.tables.append({
+            table = {
                 'coords': [x, y],
                 'rows': rows,
                 'cols': cols,
                 'data': table_data,
-                'cell_width': cell_width,
-                'cell_height': cell_height,
-                'items': table_items
-            })
-            self.update_layer_list()
-            self.save_state()
-            self.update_status(f"Tableau {rows}x{cols} ajouté")
+                'cell_width': 80,
+                'cell_height': 30
+            }
+            if source:
+                table['source'] = source
+                table['columns'] = columns
+            self.redraw_table(table)
+            self.add_object('tables', table)
+            if source:
+                self.update_status(f"Tableau lié à {os.path.basename(source)} ajouté")
+            else:
+                self.update_status(f"Tableau {rows}x{cols} ajouté")
     
     # === MÉTHODES DE FORMATAGE ===
     
@@ -816,14 +3404,8 @@ class AdvancedPDFEditor:
     def clear_canvas(self):
         result = messagebox.askyesno("Confirmation", "Effacer tout le contenu du canvas ?")
         if result:
-            self.canvas.delete("all")
-            self.shapes.clear()
-            self.images.clear()
-            self.tables.clear()
-            self.undo_stack.clear()
-            self.redo_stack.clear()
-            self.selected_item = None
-            self.update_layer_list()
+            self.clear_objects()
+            self.compact_journal()
             self.update_status("Canvas effacé")
     
     def choose_bg_color(self):
@@ -875,16 +3457,10 @@ class AdvancedPDFEditor:
         """Créer un nouveau document"""
         result = messagebox.askyesno("Nouveau document", "Voulez-vous créer un nouveau document ? Les modifications non sauvegardées seront perdues.")
         if result:
-            self.canvas.delete("all")
+            self.clear_objects()
             self.text_widget.delete("1.0", tk.END)
-            self.text_widget.insert("1.0", "Commencez à taper votre texte ici...\n\nUtilisez les outils pour formater votre document.")
-            
-            self.shapes.clear()
-            self.images.clear()
-            self.tables.clear()
-            self.undo_stack.clear()
-            self.redo_stack.clear()
-            self.selected_item = None
+            self.text_widget.insert("1.0", DEFAULT_TEXT)
+            self.text_widget.edit_reset()
             
             # Réinitialiser les paramètres par défaut
             self.bg_color = "#FFFFFF"
@@ -894,120 +3470,92 @@ class AdvancedPDFEditor:
             
             self.canvas.configure(bg=self.bg_color)
             self.text_widget.configure(fg=self.text_color, font=(self.font_family, self.font_size))
+            self.compact_journal()
             
-            self.update_layer_list()
             self.update_status("Nouveau document créé")
             
     def open_template(self):
         """Ouvrir un template sauvegardé"""
         file_path = filedialog.askopenfilename(
             title="Ouvrir un template",
-            filetypes=[("Template JSON", "*.json"), ("Tous les fichiers", "*.*")]
+            filetypes=[("Template JSON", "*.json"), ("Projet PDF", "*" + PROJECT_EXTENSION),
+                       ("Tous les fichiers", "*.*")]
         )
         if file_path:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    
-                # Vérifier la version du template
-                version = data.get('version', '1.0')
-                if version != '2.0':
-                    messagebox.showwarning("Version", "Ce template a été créé avec une version différente. Certaines fonctionnalités peuvent ne pas fonctionner correctement.")
-                
-                # Créer un nouveau document
-                self.new_document()
-                
-                # Charger les données
-                if 'text' in data:
-                    self.text_widget.delete("1.0", tk.END)
-                    self.text_widget.insert("1.0", data['text'])
+                if is_project_file(file_path):
+                    self.load_document(DocumentModel.load(file_path))
+                    self.update_status(f"Projet chargé: {os.path.basename(file_path)}")
+                    return
                     
-                self.bg_color = data.get('bg_color', '#FFFFFF')
-                self.text_color = data.get('text_color', '#000000')
-                self.font_family = data.get('font_family', 'Helvetica')
-                self.font_size = data.get('font_size', 12)
-                
-                # Charger les marges
-                margins = data.get('margins', {})
-                self.margin_left = margins.get('left', 50)
-                self.margin_right = margins.get('right', 50)
-                self.margin_top = margins.get('top', 50)
-                self.margin_bottom = margins.get('bottom', 50)
-                
-                # Mettre à jour les spinboxes des marges
-                for attr, spinbox in self.margin_spinboxes.items():
-                    spinbox.delete(0, tk.END)
-                    spinbox.insert(0, str(getattr(self, attr)))
-                
-                # Charger les formes
-                for shape_data in data.get('shapes', []):
-                    shape = self._deserialize_shape(shape_data)
-                    self.shapes.append(shape)
-                    self.redraw_shape(shape)
-                
-                # Charger les images
-                for img_data in data.get('images', []):
-                    img = self._deserialize_image(img_data)
-                    if img:
-                        self.images.append(img)
-                        self.redraw_image(img)
-                
-                # Charger les tableaux
-                for table_data in data.get('tables', []):
-                    table = self._deserialize_table(table_data)
-                    self.tables.append(table)
-                    self.redraw_table(table)
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
                     
-                # Mettre à jour l'interface
-                self.canvas.configure(bg=self.bg_color)
-                self.text_widget.configure(fg=self.text_color, font=(self.font_family, self.font_size))
-                self.font_var.set(self.font_family)
-                self.size_var.set(str(self.font_size))
+                # Vérifier la version du template
+                version = data.get('version', '1.0')
+                if version != '2.0':
+                    messagebox.showwarning("Version", "Ce template a été créé avec une version différente. Certaines fonctionnalités peuvent ne pas fonctionner correctement.")
+                
+                self.load_document(DocumentModel.from_dict(data))
                 
-                self.update_layer_list()
-                self.save_state()
                 self.update_status(f"Template chargé: {os.path.basename(file_path)}")
                 
             except Exception as e:
                 messagebox.showerror("Erreur", f"Erreur lors du chargement du template: {e}")
                 
+    def load_document(self, document):
+        """Charger un DocumentModel dans l'éditeur"""
+        self.text_widget.delete("1.0", tk.END)
+        self.text_widget.insert("1.0", document.text)
+        self.text_widget.edit_reset()
+        
+        self.bg_color = document.bg_color
+        self.text_color = document.text_color
+        self.font_family = document.font_family
+        self.font_size = document.font_size
+        self.text_align = document.text_align
+        self.line_spacing = document.line_spacing
+        
+        # Charger les marges
+        self.margin_left = document.margin_left
+        self.margin_right = document.margin_right
+        self.margin_top = document.margin_top
+        self.margin_bottom = document.margin_bottom
+        
+        # Mettre à jour les spinboxes des marges
+        for attr, spinbox in self.margin_spinboxes.items():
+            spinbox.delete(0, tk.END)
+            spinbox.insert(0, str(getattr(self, attr)))
+            
+        self.page_format_var.set(document.page_format_name)
+        self.page_format = document.page_format
+        
+        # Objets : seuls les items qui diffèrent de l'état actuel sont touchés
+        self.history.clear()
+        self.set_selection([])
+        images = [self._deserialize_image(img_data) for img_data in document.images]
+        self.reconcile({'shapes': document.shapes,
+                        'images': [img for img in images if img],
+                        'tables': document.tables})
+            
+        # Mettre à jour l'interface
+        self.canvas.configure(bg=self.bg_color)
+        self.text_widget.configure(fg=self.text_color, font=(self.font_family, self.font_size))
+        self.font_var.set(self.font_family)
+        self.size_var.set(str(self.font_size))
+        self.compact_journal()
+                
     def save_template(self):
         """Sauvegarder le template actuel"""
         file_path = filedialog.asksaveasfilename(
             title="Sauvegarder le template",
             defaultextension=".json",
-            filetypes=[("Template JSON", "*.json"), ("Tous les fichiers", "*.*")]
+            filetypes=[("Template JSON", "*.json"), ("Projet PDF (images incluses)", "*" + PROJECT_EXTENSION),
+                       ("Tous les fichiers", "*.*")]
         )
         if file_path:
             try:
-                # Préparer les données à sauvegarder
-                shapes_data = [self._serialize_shape(s) for s in self.shapes]
-                images_data = [self._serialize_image(i) for i in self.images]
-                tables_data = [self._serialize_table(t) for t in self.tables]
-                
-                data = {
-                    'text': self.text_widget.get("1.0", tk.END),
-                    'bg_color': self.bg_color,
-                    'text_color': self.text_color,
-                    'font_family': self.font_family,
-                    'font_size': self.font_size,
-                    'text_align': self.text_align,
-                    'line_spacing': self.line_spacing,
-                    'margins': {
-                        'left': self.margin_left,
-                        'right': self.margin_right,
-                        'top': self.margin_top,
-                        'bottom': self.margin_bottom
-                    },
-                    'shapes': shapes_data,
-                    'images': images_data,
-                    'tables': tables_data,
-                    'created_at': datetime.now().isoformat(),
-                    'version': '2.0'
-                }
-                
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+                self.build_document().save(file_path)
                     
                 self.update_status(f"Template sauvegardé: {os.path.basename(file_path)}")
                 messagebox.showinfo("Succès", "Template sauvegardé avec succès!")
@@ -1015,23 +3563,106 @@ class AdvancedPDFEditor:
             except Exception as e:
                 messagebox.showerror("Erreur", f"Erreur lors de la sauvegarde du template: {e}")
     
+    # === SAUVEGARDE AUTOMATIQUE ===
+    
+    def start_autosave(self):
+        """Proposer la récupération d'un journal laissé par un arrêt brutal, puis démarrer le journal"""
+        try:
+            document = replay_journal()
+        except Exception as e:
+            print(f"Journal de sauvegarde automatique illisible: {e}")
+            document = None
+        recover = document is not None and messagebox.askyesno(
+            "Récupération", "L'application ne s'est pas fermée correctement. "
+            "Voulez-vous récupérer le document en cours ?")
+        # Le journal est réécrit dans les deux cas (instantané après le chargement)
+        self.journal = AutosaveJournal()
+        if recover:
+            self.load_document(document)
+            self.update_status("Document récupéré")
+        else:
+            self.compact_journal()
+        self.autosave_job = self.root.after(AUTOSAVE_INTERVAL_MS, self.autosave_tick)
+        
+    def compact_journal(self):
+        """Remplacer le journal par un instantané de l'état courant"""
+        if self.journal is None:
+            return
+        document = self.snapshot_document()
+        uids = {kind: [obj['uid'] for obj in getattr(self, kind)] for kind in LAYER_KINDS}
+        self.journal_settings = self.settings_signature()
+        self.text_widget.edit_modified(False)
+        self.journal.snapshot(document, uids)
+        
+    def journal_command(self, command):
+        """Journaliser l'état des objets touchés par une opération (ou leur suppression).
+        
+        Avec plusieurs objets, tous sont d'abord retirés puis réinsérés par
+        position croissante : chaque position finale est alors valide au
+        moment de sa réinsertion, quel que soit l'ordre des opérations du lot.
+        """
+        if self.journal is None:
+            return
+        touched = list({obj['uid']: (kind, obj) for kind, obj in command.objects(self)}.values())
+        present = []
+        for kind, obj in touched:
+            if self.object_by_uid(obj['uid'])[1] is None or len(touched) > 1:
+                self.journal.append({'op': 'delete', 'kind': kind, 'uid': obj['uid']})
+            if self.object_by_uid(obj['uid'])[1] is not None:
+                present.append((self.index_of(kind, obj), kind, obj))
+        for index, kind, obj in sorted(present, key=lambda entry: entry[0]):
+            self.journal.append({'op': 'put', 'kind': kind, 'uid': obj['uid'], 'index': index,
+                                 'object': serialize_object(kind, obj)})
+                
+    def settings_signature(self):
+        return (self.bg_color, self.text_color, self.font_family, self.font_size, self.text_align,
+                self.line_spacing, self.margin_left, self.margin_right, self.margin_top,
+                self.margin_bottom, self.page_format_var.get())
+        
+    def autosave_tick(self):
+        """Journaliser le texte et les réglages s'ils ont changé, compacter si besoin"""
+        if self.journal.entries >= AUTOSAVE_COMPACT_ENTRIES:
+            self.compact_journal()
+        elif self.text_widget.edit_modified() or self.settings_signature() != self.journal_settings:
+            self.journal_settings = self.settings_signature()
+            self.text_widget.edit_modified(False)
+            document = self.build_document()
+            document.shapes, document.images, document.tables = [], [], []
+            data = document.to_dict()
+            self.journal.append({'op': 'settings', 'settings': {key: data[key] for key in SETTINGS_KEYS}})
+        self.autosave_job = self.root.after(AUTOSAVE_INTERVAL_MS, self.autosave_tick)
+        
+    def quit_app(self):
+        """Quitter : le journal est vidé puis supprimé (rien à récupérer)"""
+        if self.export_job is not None:
+            self.export_job.cancel()
+        if self.autosave_job is not None:
+            self.root.after_cancel(self.autosave_job)
+        if self.journal is not None:
+            self.journal.close(discard=True)
+            self.journal = None
+        self.root.quit()
+    
     # === MÉTHODES PDF ===
     
     def preview_pdf(self):
         """Générer un aperçu du PDF"""
         temp_path = os.path.join(os.path.expanduser("~"), "temp_preview.pdf")
-        if self.generate_pdf_file(temp_path):
-            try:
-                if os.name == 'nt':  # Windows
-                    os.startfile(temp_path)
-                elif os.name == 'posix':  # macOS/Linux
-                    if sys.platform == 'darwin':  # macOS
-                        os.system(f'open "{temp_path}"')
-                    else:  # Linux
-                        os.system(f'xdg-open "{temp_path}"')
-                self.update_status("Aperçu généré")
-            except Exception as e:
-                messagebox.showerror("Erreur", f"Impossible d'ouvrir l'aperçu: {e}")
+        self.start_export(temp_path, self.open_preview)
+        
+    def open_preview(self, temp_path, from_cache=False):
+        """Ouvrir l'aperçu généré avec le lecteur PDF du système"""
+        try:
+            if os.name == 'nt':  # Windows
+                os.startfile(temp_path)
+            elif os.name == 'posix':  # macOS/Linux
+                if sys.platform == 'darwin':  # macOS
+                    os.system(f'open "{temp_path}"')
+                else:  # Linux
+                    os.system(f'xdg-open "{temp_path}"')
+            self.update_status("Aperçu repris du cache" if from_cache else "Aperçu généré")
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Impossible d'ouvrir l'aperçu: {e}")
                 
     def export_pdf(self):
         """Exporter le document en PDF"""
@@ -1041,225 +3672,79 @@ class AdvancedPDFEditor:
             filetypes=[("PDF files", "*.pdf"), ("Tous les fichiers", "*.*")]
         )
         if file_path:
-            if self.generate_pdf_file(file_path):
-                messagebox.showinfo("Succès", f"PDF exporté avec succès:\n{file_path}")
-                self.update_status(f"PDF exporté: {os.path.basename(file_path)}")
-                
-    def generate_pdf_file(self, file_path):
-        """Générer le fichier PDF"""
-        try:
-            width, height = self.page_format
-            
-            # Créer le document PDF
-            doc = SimpleDocTemplate(file_path, pagesize=self.page_format,
-                                  leftMargin=self.margin_left, rightMargin=self.margin_right,
-                                  topMargin=self.margin_top, bottomMargin=self.margin_bottom)
-            
-            # Contenu du document
-            story = []
-            
-            # Ajouter le texte du widget de texte
-            text_content = self.text_widget.get("1.0", tk.END).strip()
-            if text_content and text_content != "Commencez à taper votre texte ici...\n\nUtilisez les outils pour formater votre document.":
-                # Créer un style de paragraphe
-                styles = getSampleStyleSheet()
-                style = ParagraphStyle(
-                    'CustomStyle',
-                    parent=styles['Normal'],
-                    fontName=self._get_reportlab_font(self.font_family),
-                    fontSize=self.font_size,
-                    textColor=HexColor(self.text_color),
-                    alignment=self.text_align,
-                    leading=self.font_size * self.line_spacing,
-                    backColor=HexColor(self.bg_color) if self.bg_color != '#FFFFFF' else None
-                )
-                
-                # Diviser le texte en paragraphes
-                paragraphs = text_content.split('\n\n')
-                for para_text in paragraphs:
-                    if para_text.strip():
-                        para = Paragraph(para_text.replace('\n', '<br/>'), style)
-                        story.append(para)
-                        story.append(Spacer(1, 12))
-            
-            # Créer un canvas pour dessiner les éléments graphiques
-            def draw_graphics(canvas_obj, doc_obj):
-                canvas_obj.setFillColor(HexColor(self.bg_color))
-                canvas_obj.rect(0, 0, width, height, fill=1)
-                
-                # Dessiner les éléments du canvas
-                if self.shapes or self.images or self.tables:
-                    canvas_width = self.canvas.winfo_width()
-                    canvas_height = self.canvas.winfo_height()
-                    
-                    if canvas_width > 0 and canvas_height > 0:
-                        # Calculer l'échelle
-                        content_width = width - self.margin_left - self.margin_right
-                        content_height = height - self.margin_top - self.margin_bottom
-                        scale_x = content_width / canvas_width
-                        scale_y = content_height / canvas_height
-                        scale = min(scale_x, scale_y, 1.0)  # Ne pas agrandir
-                        
-                        # Dessiner les formes
-                        for shape in self.shapes:
-                            self.draw_shape_on_pdf(canvas_obj, shape, scale, scale, width, height)
-                        
-                        # Dessiner les images
-                        for img_data in self.images:
-                            self.draw_image_on_pdf(canvas_obj, img_data, scale, width, height)
-                        
-                        # Dessiner les tableaux
-                        for table_data in self.tables:
-                            self.draw_table_on_pdf(canvas_obj, table_data, scale, width, height)
-            
-            # Construire le document
-            if story:
-                doc.build(story, onFirstPage=draw_graphics, onLaterPages=draw_graphics)
-            else:
-                # Si pas de texte, créer une page vide avec les graphiques
-                story.append(Spacer(1, height - self.margin_top - self.margin_bottom))
-                doc.build(story, onFirstPage=draw_graphics, onLaterPages=draw_graphics)
-            
-            return True
-            
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur lors de la génération du PDF: {e}")
-            return False
-            
-    def _get_reportlab_font(self, font_family):
-        """Convertir le nom de police Tkinter vers ReportLab"""
-        font_map = {
-            'Arial': 'Helvetica',
-            'Times': 'Times-Roman',
-            'Courier': 'Courier',
-            'Verdana': 'Helvetica',
-            'Helvetica': 'Helvetica',
-            'Times-Roman': 'Times-Roman'
-        }
-        return font_map.get(font_family, 'Helvetica')
-            
-    def draw_shape_on_pdf(self, c, shape, scale_x, scale_y, pdf_width, pdf_height):
-        """Dessiner une forme sur le PDF"""
-        try:
-            # Vérifier que la couleur est valide
-            color = shape.get('color', '#000000')
-            if not color.startswith('#'):
-                color = '#000000'
-            
-            c.setStrokeColor(HexColor(color))
-            line_width = shape.get('width', 2) * min(scale_x, scale_y)
-            c.setLineWidth(max(0.5, line_width))
-
-            shape_type = shape['type']
-            coords = shape['coords']
-
-            if shape_type == 'rectangle' and len(coords) >= 4:
-                x1, y1, x2, y2 = coords
-                pdf_x1 = self.margin_left + x1 * scale_x
-                pdf_y1 = pdf_height - self.margin_top - y1 * scale_y
-                pdf_x2 = self.margin_left + x2 * scale_x
-                pdf_y2 = pdf_height - self.margin_top - y2 * scale_y
-
-                c.rect(min(pdf_x1, pdf_x2), min(pdf_y1, pdf_y2),
-                      abs(pdf_x2 - pdf_x1), abs(pdf_y2 - pdf_y1), fill=0)
-
-            elif shape_type == 'circle' and len(coords) >= 4:
-                x1, y1, x2, y2 = coords
-                center_x = self.margin_left + ((x1 + x2) / 2) * scale_x
-                center_y = pdf_height - self.margin_top - ((y1 + y2) / 2) * scale_y
-                radius_x = abs(x2 - x1) / 2 * scale_x
-                radius_y = abs(y2 - y1) / 2 * scale_y
-
-                c.ellipse(center_x - radius_x, center_y - radius_y,
-                         center_x + radius_x, center_y + radius_y, fill=0)
-
-            elif shape_type in ['line', 'freehand']:
-                if len(coords) >= 4:
-                    x1, y1, x2, y2 = coords[:4]
-                    pdf_x1 = self.margin_left + x1 * scale_x
-                    pdf_y1 = pdf_height - self.margin_top - y1 * scale_y
-                    pdf_x2 = self.margin_left + x2 * scale_x
-                    pdf_y2 = pdf_height - self.margin_top - y2 * scale_y
-
-                    c.line(pdf_x1, pdf_y1, pdf_x2, pdf_y2)
-
-            elif shape_type == 'text':
-                if len(coords) >= 2:
-                    x, y = coords[:2]
-                    pdf_x = self.margin_left + x * scale_x
-                    pdf_y = pdf_height - self.margin_top - y * scale_y
-
-                    # Vérifier que la couleur est valide
-                    color = shape.get('color', '#000000')
-                    if not color.startswith('#'):
-                        color = '#000000'
-                    
-                    c.setFillColor(HexColor(color))
-                    font_name, font_size = shape.get('font', ('Helvetica', 12))
-                    scaled_font_size = max(6, int(font_size * min(scale_x, scale_y)))
-                    c.setFont(self._get_reportlab_font(font_name), scaled_font_size)
-                    
-                    # S'assurer que le texte n'est pas None
-                    text = shape.get('text', '')
-                    if text is None:
-                        text = ''
-                    c.drawString(pdf_x, pdf_y, str(text))
-
-        except Exception as e:
-            print(f"Erreur lors du dessin de la forme: {e}")
+            self.start_export(file_path, self.export_done)
             
-    def draw_image_on_pdf(self, c, img_data, scale, pdf_width, pdf_height):
-        """Dessiner une image sur le PDF"""
+    def export_done(self, file_path, from_cache=False):
+        messagebox.showinfo("Succès", f"PDF exporté avec succès:\n{file_path}")
+        origin = " (PDF repris du cache)" if from_cache else ""
+        self.update_status(f"PDF exporté: {os.path.basename(file_path)}{origin}")
+        
+    def start_export(self, file_path, on_done):
+        """Générer le PDF d'un instantané du document dans un thread ; on_done(file_path, from_cache) à la fin"""
+        if self.export_job is not None:
+            self.update_status("Un export est déjà en cours")
+            return
+        job = ExportJob(self.snapshot_document(), file_path, on_done)
+        job.future = self.export_executor.submit(job.run)
+        self.export_job = job
+        self.status_bar.configure(text="Génération du PDF...")
+        self.cancel_export_button.place(relx=1.0, rely=0.5, anchor="e")
+        self.root.after(EXPORT_POLL_MS, self.poll_export)
+        
+    def poll_export(self):
+        """Suivre l'export en cours : progression, puis résultat remis au thread Tk"""
+        job = self.export_job
+        if not job.future.done():
+            state = "annulation..." if job.cancelled.is_set() else f"page {job.page + 1}"
+            self.status_bar.configure(text=f"Génération du PDF : {state}")
+            self.root.after(EXPORT_POLL_MS, self.poll_export)
+            return
+        self.export_job = None
+        self.cancel_export_button.place_forget()
         try:
-            x, y = img_data['coords']
-            img_path = img_data['path']
-            
-            if os.path.exists(img_path):
-                pdf_x = self.margin_left + x * scale
-                pdf_y = pdf_height - self.margin_top - y * scale
-                
-                # Taille par défaut de l'image
-                img_width = 100 * scale
-                img_height = 100 * scale
-                
-                c.drawImage(img_path, pdf_x, pdf_y - img_height, 
-                           width=img_width, height=img_height, preserveAspectRatio=True)
-                
+            job.future.result()
+        except ExportCancelled:
+            self.update_status("Export annulé")
+            return
         except Exception as e:
-            print(f"Erreur lors du dessin de l'image: {e}")
-            
-    def draw_table_on_pdf(self, c, table_data, scale, pdf_width, pdf_height):
-        """Dessiner un tableau sur le PDF"""
-        try:
-            x, y = table_data['coords']
-            rows, cols = table_data['rows'], table_data['cols']
-            cell_width, cell_height = table_data['cell_width'], table_data['cell_height']
+            self.update_status("Échec de l'export")
+            messagebox.showerror("Erreur", f"Erreur lors de la génération du PDF: {e}")
+            return
+        job.on_done(job.file_path, job.from_cache)
+        
+    def cancel_export(self):
+        if self.export_job is not None:
+            self.export_job.cancel()
             
-            scaled_cell_width = cell_width * scale
-            scaled_cell_height = cell_height * scale
+    def snapshot_document(self):
+        """DocumentModel indépendant de l'éditeur (objets copiés), utilisable depuis un autre thread"""
+        document = self.build_document()
+        document.shapes = [shape.copy() for shape in self.shapes]
+        document.images = [dict(image) for image in self.images]
+        document.tables = [dict(table) for table in self.tables]
+        return document
             
-            c.setStrokeColor(HexColor("#000000"))
-            c.setFillColor(HexColor("#000000"))
-            c.setLineWidth(1)
+    def build_document(self):
+        """Construire un DocumentModel à partir de l'état de l'éditeur"""
+        document = DocumentModel()
+        document.text = self.text_widget.get("1.0", tk.END)
+        document.bg_color = self.bg_color
+        document.text_color = self.text_color
+        document.font_family = self.font_family
+        document.font_size = self.font_size
+        document.text_align = self.text_align
+        document.line_spacing = self.line_spacing
+        document.margin_left = self.margin_left
+        document.margin_right = self.margin_right
+        document.margin_top = self.margin_top
+        document.margin_bottom = self.margin_bottom
+        document.page_format_name = self.page_format_var.get()
+        document.canvas_size = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        document.shapes = self.shapes
+        document.images = self.images
+        document.tables = self.tables
+        return document
             
-            for i in range(rows):
-                for j in range(cols):
-                    cell_x = self.margin_left + (x + j * cell_width) * scale
-                    cell_y = pdf_height - self.margin_top - (y + (i + 1) * cell_height) * scale
-                    
-                    # Dessiner la cellule
-                    c.rect(cell_x, cell_y, scaled_cell_width, scaled_cell_height, fill=0)
-                    
-                    # Dessiner le texte
-                    cell_text = table_data['data'][i][j] if table_data['data'][i][j] else f"Cellule {i+1},{j+1}"
-                    c.setFont("Helvetica", max(6, int(8 * scale)))
-                    text_x = cell_x + scaled_cell_width / 2
-                    text_y = cell_y + scaled_cell_height / 2
-                    c.drawCentredString(text_x, text_y, cell_text)
-                    
-        except Exception as e:
-            print(f"Erreur lors du dessin du tableau: {e}")
-    
     # === MÉTHODES D'ÉDITION ===
     
     def copy_text(self):
@@ -1290,369 +3775,726 @@ class AdvancedPDFEditor:
         self.text_widget.see(tk.INSERT)
         
     def zoom_in(self):
-        """Augmenter la taille de la police"""
-        current_font = self.text_widget.cget('font')
-        if isinstance(current_font, tuple):
-            family, size = current_font[0], current_font[1]
-        else:
-            family, size = self.font_family, self.font_size
-        new_size = min(size + 2, 72)
-        self.text_widget.configure(font=(family, new_size))
-        self.font_size = new_size
-        self.size_var.set(str(new_size))
-        self.update_status(f"Zoom: {new_size}pt")
+        """Agrandir la vue du canvas"""
+        self.set_zoom(self.zoom * ZOOM_STEP)
         
     def zoom_out(self):
-        """Diminuer la taille de la police"""
-        current_font = self.text_widget.cget('font')
-        if isinstance(current_font, tuple):
-            family, size = current_font[0], current_font[1]
-        else:
-            family, size = self.font_family, self.font_size
-        new_size = max(size - 2, 8)
-        self.text_widget.configure(font=(family, new_size))
-        self.font_size = new_size
-        self.size_var.set(str(new_size))
-        self.update_status(f"Zoom: {new_size}pt")
+        """Réduire la vue du canvas"""
+        self.set_zoom(self.zoom / ZOOM_STEP)
+        
+    def zoom_at(self, zoom_in, x, y):
+        """Zoomer en gardant fixe le point (x, y) de la fenêtre"""
+        self.set_zoom(self.zoom * ZOOM_STEP if zoom_in else self.zoom / ZOOM_STEP, x, y)
         
     def fit_to_window(self):
-        """Réinitialiser le zoom"""
-        self.text_widget.configure(font=(self.font_family, 12))
-        self.font_size = 12
-        self.size_var.set("12")
-        self.update_status("Zoom réinitialisé")
+        """Ajuster le zoom pour afficher toute la zone de dessin"""
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        self.set_zoom(min(width, height) / CANVAS_SIZE)
+        self.canvas.xview_moveto(0)
+        self.canvas.yview_moveto(0)
+        
+    def set_zoom(self, zoom, x=None, y=None):
+        """Changer le zoom du canvas ; le point (x, y) de la fenêtre (par défaut le centre) reste fixe"""
+        zoom = round(min(MAX_ZOOM, max(MIN_ZOOM, zoom)), 4)
+        if zoom == self.zoom:
+            return
+        if x is None:
+            x, y = self.canvas.winfo_width() / 2, self.canvas.winfo_height() / 2
+        doc_x, doc_y = self.canvas.canvasx(x) / self.zoom, self.canvas.canvasy(y) / self.zoom
+        
+        # Tous les items sont recréés à la nouvelle échelle en redevenant visibles
+        self.hide_objects([(kind, obj) for kind in LAYER_KINDS for obj in self.drawn[kind]])
+        self.clear_tiles()
+        self.zoom = zoom
+        extent = CANVAS_SIZE * zoom
+        self.canvas.configure(scrollregion=(0, 0, extent, extent))
+        self.canvas.xview_moveto(max(0.0, doc_x * zoom - x) / extent)
+        self.canvas.yview_moveto(max(0.0, doc_y * zoom - y) / extent)
+        self.draw_selection()
+        self.refresh_viewport()
+        self.update_status(f"Zoom: {round(zoom * 100)}%")
     
     # === MÉTHODES DE GESTION DES CALQUES ===
         
-    def update_layer_list(self):
-        self.layer_listbox.delete(0, tk.END)
-        
-        # Ajouter les formes
-        for i, shape in enumerate(self.shapes):
-            layer_name = f"Forme {i+1} ({shape['type']})"
-            if shape['type'] == 'text' and 'text' in shape:
-                preview = shape['text'][:20] + "..." if len(shape['text']) > 20 else shape['text']
-                layer_name = f"Texte {i+1}: {preview}"
-            self.layer_listbox.insert(tk.END, layer_name)
-            
-        # Ajouter les images
-        for i, img in enumerate(self.images):
-            filename = os.path.basename(img['path'])
-            layer_name = f"Image {i+1}: {filename}"
-            self.layer_listbox.insert(tk.END, layer_name)
-            
-        # Ajouter les tableaux
-        for i, table in enumerate(self.tables):
-            layer_name = f"Tableau {i+1} ({table['rows']}x{table['cols']})"
-            self.layer_listbox.insert(tk.END, layer_name)
-            
     def add_layer(self):
         """Ajouter un nouveau calque"""
         self.update_status("Utilisez les outils pour ajouter des éléments")
         
     def remove_layer(self):
-        selection = self.layer_listbox.curselection()
-        if selection:
-            index = selection[0]
-            total_shapes = len(self.shapes)
-            total_images = len(self.images)
-            
-            if index < total_shapes:
-                # Supprimer une forme
-                shape = self.shapes[index]
-                if 'id' in shape:
-                    self.canvas.delete(shape['id'])
-                del self.shapes[index]
-            elif index < total_shapes + total_images:
-                # Supprimer une image
-                img_index = index - total_shapes
-                img = self.images[img_index]
-                if 'id' in img:
-                    self.canvas.delete(img['id'])
-                del self.images[img_index]
-            else:
-                # Supprimer un tableau
-                table_index = index - total_shapes - total_images
-                if table_index < len(self.tables):
-                    table = self.tables[table_index]
-                    # Supprimer tous les éléments du tableau
-                    for item_id in table.get('items', []):
-                        self.canvas.delete(item_id)
-                    del self.tables[table_index]
-                    
-            self.update_layer_list()
-            self.save_state()
-            self.update_status("Calque supprimé")
+        row = self.layer_panel.selected_row()
+        if row is not None:
+            kind, index = self.layer_panel.row_object(row)
+            if kind:
+                obj = getattr(self, kind)[index]
+                self.remove_object(kind, obj)
+                self.history.push(DeleteCommand(kind, obj, index))
+                self.update_status("Calque supprimé")
                 
     def move_layer_up(self):
         """Déplacer un calque vers le haut"""
-        selection = self.layer_listbox.curselection()
-        if selection and selection[0] > 0:
-            index = selection[0]
-            total_shapes = len(self.shapes)
-            total_images = len(self.images)
-            
-            if index < total_shapes and index > 0:
-                # Déplacer une forme
-                self.shapes[index-1], self.shapes[index] = self.shapes[index], self.shapes[index-1]
-                self.update_layer_list()
-                self.layer_listbox.selection_set(index-1)
+        row = self.layer_panel.selected_row()
+        if row is not None:
+            kind, index = self.layer_panel.row_object(row)
+            if kind and index > 0:
+                self.reorder_object(kind, index, index - 1)
+                self.history.push(ReorderCommand(kind, index, index - 1))
+                self.layer_panel.select_row(row - 1)
                 self.update_status("Calque déplacé vers le haut")
         
     def move_layer_down(self):
         """Déplacer un calque vers le bas"""
-        selection = self.layer_listbox.curselection()
-        if selection:
-            index = selection[0]
-            total_shapes = len(self.shapes)
-            total_images = len(self.images)
-            total_items = total_shapes + total_images + len(self.tables)
-            
-            if index < total_items - 1:
-                if index < total_shapes - 1:
-                    # Déplacer une forme
-                    self.shapes[index], self.shapes[index+1] = self.shapes[index+1], self.shapes[index]
-                    self.update_layer_list()
-                    self.layer_listbox.selection_set(index+1)
-                    self.update_status("Calque déplacé vers le bas")
+        row = self.layer_panel.selected_row()
+        if row is not None:
+            kind, index = self.layer_panel.row_object(row)
+            if kind and index < len(getattr(self, kind)) - 1:
+                self.reorder_object(kind, index, index + 1)
+                self.history.push(ReorderCommand(kind, index, index + 1))
+                self.layer_panel.select_row(row + 1)
+                self.update_status("Calque déplacé vers le bas")
     
     # === MÉTHODES UNDO/REDO ===
         
-    def save_state(self):
-        """Sauvegarder l'état actuel pour l'undo/redo"""
-        try:
-            state = {
-                'shapes': [self._serialize_shape(s) for s in self.shapes],
-                'images': [self._serialize_image(i) for i in self.images],
-                'tables': [self._serialize_table(t) for t in self.tables],
-                'text': self.text_widget.get("1.0", tk.END),
-                'bg_color': self.bg_color,
-                'text_color': self.text_color,
-                'font_family': self.font_family,
-                'font_size': self.font_size
-            }
-            self.undo_stack.append(state)
-            self.redo_stack.clear()
-            if len(self.undo_stack) > 50:
-                self.undo_stack.pop(0)
-        except Exception as e:
-            print(f"Erreur lors de la sauvegarde de l'état: {e}")
-            
-    def _serialize_shape(self, shape):
-        """Sérialiser une forme pour la sauvegarde"""
-        serialized = {
-            'type': shape['type'],
-            'coords': shape['coords'],
-            'color': shape['color']
-        }
-        if 'text' in shape:
-            serialized['text'] = shape['text']
-        if 'font' in shape:
-            serialized['font'] = shape['font']
-        if 'width' in shape:
-            serialized['width'] = shape['width']
-        return serialized
-        
-    def _serialize_image(self, img):
-        """Sérialiser une image pour la sauvegarde"""
-        return {
-            'path': img['path'],
-            'coords': img['coords']
-        }
-        
-    def _serialize_table(self, table):
-        """Sérialiser un tableau pour la sauvegarde"""
-        return {
-            'coords': table['coords'],
-            'rows': table['rows'],
-            'cols': table['cols'],
-            'data': table['data'],
-            'cell_width': table['cell_width'],
-            'cell_height': table['cell_height']
-        }
-            
     def undo(self):
-        if self.undo_stack:
-            try:
-                current_state = {
-                    'shapes': [self._serialize_shape(s) for s in self.shapes],
-                    'images': [self._serialize_image(i) for i in self.images],
-                    'tables': [self._serialize_table(t) for t in self.tables],
-                    'text': self.text_widget.get("1.0", tk.END),
-                    'bg_color': self.bg_color,
-                    'text_color': self.text_color,
-                    'font_family': self.font_family,
-                    'font_size': self.font_size
-                }
-                self.redo_stack.append(current_state)
-                
-                prev_state = self.undo_stack.pop()
-                self.restore_state(prev_state)
+        try:
+            if self.history.undo(self):
                 self.update_status("Annulation effectuée")
-            except Exception as e:
-                messagebox.showerror("Erreur", f"Erreur lors de l'annulation: {e}")
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Erreur lors de l'annulation: {e}")
             
     def redo(self):
-        if self.redo_stack:
-            try:
-                current_state = {
-                    'shapes': [self._serialize_shape(s) for s in self.shapes],
-                    'images': [self._serialize_image(i) for i in self.images],
-                    'tables': [self._serialize_table(t) for t in self.tables],
-                    'text': self.text_widget.get("1.0", tk.END),
-                    'bg_color': self.bg_color,
-                    'text_color': self.text_color,
-                    'font_family': self.font_family,
-                    'font_size': self.font_size
-                }
-                self.undo_stack.append(current_state)
-                
-                next_state = self.redo_stack.pop()
-                self.restore_state(next_state)
+        try:
+            if self.history.redo(self):
                 self.update_status("Rétablissement effectué")
-            except Exception as e:
-                messagebox.showerror("Erreur", f"Erreur lors du rétablissement: {e}")
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Erreur lors du rétablissement: {e}")
             
-    def restore_state(self, state):
-        """Restaurer un état sauvegardé"""
+    def undo_text(self, event=None):
+        """Annuler la dernière saisie dans l'éditeur de texte"""
         try:
-            # Effacer le canvas
-            self.canvas.delete("all")
-            
-            # Restaurer les propriétés
-            self.bg_color = state['bg_color']
-            self.text_color = state['text_color']
-            self.font_family = state['font_family']
-            self.font_size = state['font_size']
+            self.text_widget.edit_undo()
+        except tk.TclError:
+            pass
+        return "break"
+        
+    def redo_text(self, event=None):
+        """Rétablir la dernière saisie dans l'éditeur de texte"""
+        try:
+            self.text_widget.edit_redo()
+        except tk.TclError:
+            pass
+        return "break"
+        
+    # === OPÉRATIONS SUR LES OBJETS DU DOCUMENT ===
+    
+    def add_object(self, kind, obj):
+        """Ajouter au document un objet déjà dessiné et l'enregistrer dans l'historique"""
+        objects = getattr(self, kind)
+        self.register_object(kind, obj)
+        self.registry.append(kind, objects, obj)
+        self.track_drawn(kind, obj)
+        self.history.push(AddCommand(kind, obj, len(objects) - 1))
+        
+    def register_object(self, kind, obj):
+        """Enregistrer un objet dessiné dans le registre et l'index spatial"""
+        if obj.get('uid') is None:
+            obj['uid'] = new_uid()
+        self.registry.register(kind, obj, self.object_items(kind, obj))
+        self.update_bounds(kind, obj)
+        
+    def update_bounds(self, kind, obj):
+        """Mettre à jour la boîte englobante d'un objet dans l'index spatial"""
+        bbox = None
+        if kind == 'shapes' and obj['type'] == 'text' and obj.get('id'):
+            # Étendue exacte du texte telle que rendue par Tk
+            bbox = self.canvas.bbox(obj['id'])
+            bbox = bbox and tuple(c / self.zoom for c in bbox)
+        bbox = bbox or object_bounds(kind, obj)
+        old = self.spatial_index.bbox(obj['uid'])
+        self.spatial_index.insert(obj['uid'], bbox, (kind, obj))
+        if old is not None:
+            bbox = (min(bbox[0], old[0]), min(bbox[1], old[1]), max(bbox[2], old[2]), max(bbox[3], old[3]))
+        self.invalidate_tiles(kind, bbox)
+        
+    def object_items(self, kind, obj):
+        """Items canvas d'un objet"""
+        if kind == 'tables':
+            return list(obj.get('items', []))
+        return [obj['id']] if obj.get('id') else []
+        
+    def find_object(self, item):
+        """Retrouver (kind, objet) à partir d'un item canvas"""
+        return self.registry.lookup_item(item)
+        
+    def object_by_uid(self, uid):
+        """Retrouver (kind, objet) à partir de son identifiant stable"""
+        return self.registry.lookup_uid(uid)
+        
+    def index_of(self, kind, obj):
+        """Position d'un objet dans sa liste (comparaison par identité)"""
+        return self.registry.position(kind, getattr(self, kind), obj)
+        
+    def draw_object(self, kind, obj):
+        """Créer les items canvas d'un objet"""
+        if kind == 'shapes':
+            self.redraw_shape(obj)
+        elif kind == 'images':
+            self.redraw_image(obj)
+        else:
+            self.redraw_table(obj)
             
-            # Restaurer le texte
-            self.text_widget.delete("1.0", tk.END)
-            self.text_widget.insert("1.0", state['text'])
+    def insert_object(self, kind, obj, index):
+        """Réinsérer un objet dans le document et le redessiner"""
+        self.draw_object(kind, obj)
+        self.register_object(kind, obj)
+        self.registry.insert(kind, getattr(self, kind), index, obj)
+        self.track_drawn(kind, obj)
+        
+    def remove_object(self, kind, obj):
+        """Retirer un objet du document et du canvas, retourne sa position"""
+        self.untrack_drawn(kind, obj)
+        index = self.registry.remove(kind, getattr(self, kind), obj)
+        items = self.object_items(kind, obj)
+        for item in items:
+            self.canvas.delete(item)
+        self.registry.unregister(obj, items)
+        self.invalidate_tiles(kind, self.spatial_index.bbox(obj.get('uid')))
+        self.spatial_index.remove(obj.get('uid'))
+        if obj.get('uid') in self.selected_uids:
+            self.set_selection([entry for entry in self.selection if entry[1] is not obj])
+        if kind == 'tables':
+            obj['items'] = []
+        else:
+            obj['id'] = None
+        return index
+        
+    def update_object(self, kind, obj, changes):
+        """Modifier des propriétés d'un objet et mettre à jour uniquement cet objet"""
+        old_items = self.object_items(kind, obj)
+        obj.update(changes)
+        # Un objet pas encore matérialisé sera dessiné à jour en devenant visible
+        if old_items and self.sync_object(kind, obj):
+            old_items = []
+        elif old_items:
+            self.draw_object(kind, obj)
+        if old_items:
+            for item in self.object_items(kind, obj):
+                self.canvas.tag_lower(item, old_items[0])
+            for item in old_items:
+                self.canvas.delete(item)
+            self.registry.forget_items(old_items)
+            if not self.object_items(kind, obj):
+                self.untrack_drawn(kind, obj)
+        self.register_object(kind, obj)
+        if obj['uid'] in self.selected_uids:
+            self.draw_selection()
+        self.registry.touch(kind, getattr(self, kind), obj)
+        
+    def item_type(self, kind, obj):
+        """Type d'item canvas réutilisable pour un objet (None pour les tableaux)"""
+        if kind == 'shapes':
+            return SHAPE_ITEM_TYPES.get(obj['type'])
+        return 'image' if kind == 'images' else None
+        
+    def sync_object(self, kind, obj):
+        """Reconfigurer en place l'item existant d'un objet ; False s'il faut le redessiner"""
+        item = obj.get('id')
+        if not item or self.item_type(kind, obj) is None or self.canvas.type(item) != self.item_type(kind, obj):
+            return False
+        if kind == 'shapes':
+            self.canvas.coords(item, *scale_coords(obj['coords'], self.zoom))
+            self.canvas.itemconfig(item, **shape_item_options(obj, self.zoom))
+        else:
+            self.canvas.coords(item, *scale_coords(obj['coords'][:2], self.zoom))
+            self.canvas.itemconfig(item, image=self.ensure_photo(obj))
+        return True
+        
+    def reconcile(self, targets):
+        """Amener les objets du canvas à un état cible {kind: [objets]} en ne touchant que ce qui diffère.
+        
+        Les objets identiques sont conservés avec leurs items, ceux dont le contenu
+        change réutilisent l'item d'un objet disparu du même type, et seuls les
+        autres sont supprimés. Les nouveaux objets ne sont dessinés qu'en entrant
+        dans la zone visible.
+        """
+        ordered = []
+        self.reset_tiles()
+        for kind in LAYER_KINDS:
+            current = getattr(self, kind)
+            identical = {}
+            for obj in reversed(current):
+                identical.setdefault(object_signature(kind, obj), []).append(obj)
+            matched = []
+            for target in targets[kind]:
+                candidates = identical.get(object_signature(kind, target)) if identical else None
+                matched.append(candidates.pop() if candidates else None)
+                
+            # Items des objets disparus, réutilisables pour les objets modifiés
+            spare = {}
+            for candidates in identical.values():
+                for obj in candidates:
+                    spare.setdefault(self.item_type(kind, obj), []).append(obj)
+            objects = []
+            for target, obj in zip(targets[kind], matched):
+                if obj is None:
+                    reusable = spare.get(self.item_type(kind, target)) if self.item_type(kind, target) else None
+                    if reusable:
+                        obj = reusable.pop()
+                        for key in set(obj) - set(target) - {'id', 'uid'}:
+                            del obj[key]
+                        obj.update({key: value for key, value in target.items() if key not in ('id', 'uid')})
+                        self.sync_object(kind, obj)
+                        self.register_object(kind, obj)
+                    else:
+                        obj = target
+                        obj['uid'] = None
+                        self.register_object(kind, obj)
+                objects.append(obj)
+            for candidates in spare.values():
+                for obj in candidates:
+                    items = self.object_items(kind, obj)
+                    for item in items:
+                        self.canvas.delete(item)
+                    self.registry.unregister(obj, items)
+                    self.spatial_index.remove(obj.get('uid'))
+            self.registry.replace(kind, current, objects)
+            self.drawn[kind] = [obj for obj in objects if self.object_items(kind, obj)]
+            ordered.extend((kind, obj) for obj in self.drawn[kind])
+        self.drawn_uids = {obj['uid'] for kind, obj in ordered}
             
-            # Restaurer les formes
-            self.shapes = []
-            for shape_data in state['shapes']:
-                self.shapes.append(self._deserialize_shape(shape_data))
+        # Ne replacer dans la pile que les objets conservés qui sont mal placés
+        positions = {item: i for i, item in enumerate(self.canvas.find_all())}
+        below, below_position = None, -1
+        for kind, obj in ordered:
+            items = self.object_items(kind, obj)
+            in_place = positions.get(items[0], -1) > below_position
+            if in_place:
+                below_position = positions[items[-1]]
+            if not in_place:
+                if below is None:
+                    self.canvas.tag_lower(items[0])
+                else:
+                    self.canvas.tag_raise(items[0], below)
+                for previous, item in zip(items, items[1:]):
+                    self.canvas.tag_raise(item, previous)
+            below = items[-1]
+        self.refresh_viewport()
+        self.draw_selection()
+        
+    # === MATÉRIALISATION DES OBJETS VISIBLES ===
+    
+    def clear_objects(self):
+        """Retirer tous les objets du document et du canvas"""
+        self.canvas.delete("all")
+        self.shapes.clear()
+        self.images.clear()
+        self.tables.clear()
+        self.history.clear()
+        self.spatial_index.clear()
+        self.registry.clear()
+        self.drawn = {kind: [] for kind in LAYER_KINDS}
+        self.drawn_uids.clear()
+        self.prefetch_queue.clear()
+        self.reset_tiles()
+        self.set_selection([])
+        
+    def ensure_photo(self, image):
+        """PhotoImage d'une image, décodée au premier affichage"""
+        if image.get('image') is None and self.zoom == 1.0:
+            image['pil_image'], image['image'] = IMAGE_CACHE.get_photo(image_source(image))
+        elif image.get('image') is None:
+            # Miniature à l'échelle du zoom ; la taille au zoom 1 reste celle du modèle
+            if image.get('pil_image') is None and 'size' not in image:
+                image['size'] = thumbnail_size(image_source(image))
+            max_size = tuple(max(1, round(side * self.zoom)) for side in THUMBNAIL_SIZE)
+            image['image'] = IMAGE_CACHE.get_photo(image_source(image), max_size)[1]
+        return image['image']
+        
+    def _drawn_index(self, kind, obj):
+        """Position d'un objet dans la liste des objets dessinés (triée par clé d'ordre)"""
+        keys = self.registry.keys
+        drawn = self.drawn[kind]
+        key = keys[obj['uid']]
+        if not drawn or keys[drawn[-1]['uid']] < key:
+            return len(drawn)
+        lo, hi = 0, len(drawn)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if keys[drawn[mid]['uid']] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+        
+    def track_drawn(self, kind, obj):
+        """Inscrire un objet qui vient d'être dessiné et placer ses items selon l'ordre du document"""
+        uid = obj['uid']
+        items = self.object_items(kind, obj)
+        if uid in self.drawn_uids or not items:
+            return
+        index = self._drawn_index(kind, obj)
+        self.drawn[kind].insert(index, obj)
+        self.drawn_uids.add(uid)
+        self.place_items(kind, index, items)
+        
+    def untrack_drawn(self, kind, obj):
+        """Retirer un objet de la liste des objets dessinés (avant de changer sa clé d'ordre)"""
+        if obj.get('uid') not in self.drawn_uids:
+            return
+        self.drawn_uids.discard(obj['uid'])
+        del self.drawn[kind][self._drawn_index(kind, obj)]
+        
+    def place_items(self, kind, index, items):
+        """Placer les items du index-ième objet dessiné juste sous ceux de l'objet dessiné suivant"""
+        successor = None
+        if index + 1 < len(self.drawn[kind]):
+            successor = self.object_items(kind, self.drawn[kind][index + 1])
+        else:
+            for later in LAYER_KINDS[LAYER_KINDS.index(kind) + 1:]:
+                if self.drawn[later]:
+                    successor = self.object_items(later, self.drawn[later][0])
+                    break
+                # Calque de tuiles d'un type suivant : sous sa tuile la plus basse (la plus ancienne)
+                tile = next((item for (layer, _, _), item in self.tile_items.items() if layer == later), None)
+                if tile is not None:
+                    successor = [tile]
+                    break
+        # Sans successeur, des items tout juste créés sont déjà au sommet de la pile
+        if successor:
+            for item in items:
+                self.canvas.tag_lower(item, successor[0])
                 
-            # Restaurer les images
-            self.images = []
-            for img_data in state['images']:
-                restored_img = self._deserialize_image(img_data)
-                if restored_img:
-                    self.images.append(restored_img)
-                    
-            # Restaurer les tableaux
-            self.tables = []
-            for table_data in state['tables']:
-                self.tables.append(self._deserialize_table(table_data))
+    def show_object(self, kind, obj):
+        """Créer les items canvas d'un objet du document qui n'est pas encore dessiné"""
+        self.draw_object(kind, obj)
+        self.registry.register(kind, obj, self.object_items(kind, obj))
+        if kind == 'images' or obj.get('type') == 'text':
+            # Taille exacte connue une fois l'objet dessiné
+            self.update_bounds(kind, obj)
+        self.track_drawn(kind, obj)
+        
+    def hide_objects(self, hidden):
+        """Détruire les items canvas d'objets (kind, objet) dessinés, sans les retirer du document"""
+        uids = set()
+        for kind, obj in hidden:
+            items = self.object_items(kind, obj)
+            for item in items:
+                self.canvas.delete(item)
+            self.registry.forget_items(items)
+            if kind == 'tables':
+                obj['items'] = []
+            else:
+                obj['id'] = None
+            if kind == 'images':
+                # Ne pas retenir la miniature : le cache peut l'évincer
+                if obj.get('pil_image') is not None:
+                    obj['size'] = obj['pil_image'].size
+                obj['image'] = obj['pil_image'] = None
+            uids.add(obj['uid'])
+        if uids:
+            self.drawn_uids -= uids
+            for kind in LAYER_KINDS:
+                self.drawn[kind] = [obj for obj in self.drawn[kind] if obj['uid'] not in uids]
                 
-            # Redessiner tout
-            for shape in self.shapes:
-                self.redraw_shape(shape)
-            for image in self.images:
-                self.redraw_image(image)
-            for table in self.tables:
-                self.redraw_table(table)
+    def cull_objects(self, region):
+        """Détruire les items des objets dessinés hors de la zone (sauf ceux sélectionnés)"""
+        x1, y1, x2, y2 = region
+        bbox = self.spatial_index.bbox
+        # En mode tuiles, formes et tableaux n'ont pas d'items
+        tiled = TILED_KINDS if self.zoom < LOD_ZOOM else ()
+        hidden = []
+        for kind in LAYER_KINDS:
+            for obj in self.drawn[kind]:
+                bx1, by1, bx2, by2 = bbox(obj['uid'])
+                if obj['uid'] in self.selected_uids:
+                    continue
+                if kind in tiled or bx2 < x1 or x2 < bx1 or by2 < y1 or y2 < by1:
+                    hidden.append((kind, obj))
+        self.hide_objects(hidden)
+        
+    def visible_region(self, margin=0.0):
+        """Zone affichée (coordonnées du document), élargie de margin fois sa taille de chaque côté"""
+        x, y = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        width, height = max(self.canvas.winfo_width(), 1), max(self.canvas.winfo_height(), 1)
+        return tuple(c / self.zoom for c in (x - width * margin, y - height * margin,
+                                             x + width * (1 + margin), y + height * (1 + margin)))
+                
+    def pending_in(self, region):
+        """Objets du document situés dans la zone mais pas encore dessinés, dans l'ordre du document"""
+        keys = self.registry.keys
+        tiled = TILED_KINDS if self.zoom < LOD_ZOOM else ()
+        pending = [(kind, obj) for kind, obj in self.spatial_index.query_rect(*region)
+                   if obj['uid'] not in self.drawn_uids and kind not in tiled]
+        # Dessinés dans l'ordre, la plupart des items se retrouvent directement à leur place
+        pending.sort(key=lambda entry: (LAYER_KINDS.index(entry[0]), keys[entry[1]['uid']]))
+        return pending
                 
-            self.update_layer_list()
+    def on_view_change(self, scrollbar, first, last):
+        """Défilement du canvas : suivre avec la barre et matérialiser la nouvelle zone"""
+        scrollbar.set(first, last)
+        self.schedule_viewport_refresh()
+        
+    def schedule_viewport_refresh(self):
+        if self.viewport_job is None:
+            self.viewport_job = self.canvas.after_idle(self.refresh_viewport)
             
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur lors de la restauration: {e}")
-            
-    def _deserialize_shape(self, shape_data):
-        """Désérialiser une forme"""
-        return {
-            'type': shape_data['type'],
-            'coords': shape_data['coords'],
-            'color': shape_data['color'],
-            'text': shape_data.get('text', ''),
-            'font': shape_data.get('font', ('Arial', 12)),
-            'width': shape_data.get('width', 2),
-            'id': None  # Sera assigné lors du redessin
-        }
+    def refresh_viewport(self):
+        """Dessiner les objets visibles, préparer ceux des régions voisines et détruire les autres"""
+        self.viewport_job = None
+        if self.drag_target is None:
+            self.cull_objects(self.visible_region(VIEWPORT_KEEP_MARGIN))
+        for kind, obj in self.pending_in(self.visible_region()):
+            self.show_object(kind, obj)
+        self.prefetch(self.pending_in(self.visible_region(VIEWPORT_PREFETCH_MARGIN)))
+        if self.zoom < LOD_ZOOM:
+            self.refresh_tiles(self.visible_region(VIEWPORT_PREFETCH_MARGIN))
+        else:
+            self.clear_tiles()
+        
+    def prefetch(self, pending):
+        """Décoder les miniatures en arrière-plan et dessiner les objets par tranches pendant l'inactivité"""
+        self.prefetch_queue = deque(pending)
+        sources = {image_source(obj) for kind, obj in pending
+                   if kind == 'images' and obj.get('image') is None}
+        if sources:
+            self.prefetch_executor.submit(decode_thumbnails, sources)
+        if pending and self.prefetch_job is None:
+            self.prefetch_job = self.canvas.after(PREFETCH_DELAY_MS, self.prefetch_step)
+            
+    def prefetch_step(self):
+        """Dessiner une tranche d'objets préchargés (thread Tk)"""
+        self.prefetch_job = None
+        queue = self.prefetch_queue
+        for _ in range(min(MATERIALIZE_BATCH, len(queue))):
+            kind, obj = queue.popleft()
+            # L'objet a pu être dessiné ou retiré du document entre-temps
+            if obj['uid'] not in self.drawn_uids and self.object_by_uid(obj['uid'])[1] is obj:
+                self.show_object(kind, obj)
+        if queue:
+            self.prefetch_job = self.canvas.after(PREFETCH_DELAY_MS, self.prefetch_step)
+            
+    # === TUILES RASTER DU CANVAS ===
+    
+    def refresh_tiles(self, region):
+        """Afficher les tuiles de la zone, en lançant en arrière-plan le rendu de celles qui manquent"""
+        size = TILE_PIXELS / self.zoom
+        x1, y1, x2, y2 = (max(0.0, min(c, CANVAS_SIZE)) for c in region)
+        columns = range(int(x1 // size), int(x2 // size) + 1)
+        rows = range(int(y1 // size), int(y2 // size) + 1)
+        wanted = set()
+        for layer in TILED_KINDS:
+            for tx in columns:
+                for ty in rows:
+                    wanted.add((layer, tx, ty))
+                    key = (layer, self.zoom, tx, ty)
+                    if key in self.tile_cache:
+                        self.tile_cache.move_to_end(key)
+                        self.show_tile(layer, tx, ty, self.tile_cache[key])
+                    elif key not in self.tile_jobs:
+                        self.submit_tile(key)
+        for tile in set(self.tile_items) - wanted:
+            self.show_tile(*tile, None)
+            
+    def submit_tile(self, key):
+        """Confier le rendu d'une tuile au thread de rendu, à partir d'une copie de ses objets"""
+        layer, zoom, tx, ty = key
+        x1, y1, x2, y2 = tile_rect(zoom, tx, ty)
+        bleed = TILE_BLEED / zoom
+        keys = self.registry.keys
+        objects = [obj for kind, obj in self.spatial_index.query_rect(x1 - bleed, y1 - bleed, x2 + bleed, y2 + bleed)
+                   if kind == layer]
+        if not objects:
+            self.cache_tile(key, None)
+            self.show_tile(layer, tx, ty, None)
+            return
+        objects.sort(key=lambda obj: keys[obj['uid']])
+        snapshot = [tile_snapshot(layer, obj) for obj in objects]
+        # [future, valide] : une modification pendant le rendu invalide le résultat
+        self.tile_jobs[key] = [self.prefetch_executor.submit(render_tile, zoom, tx, ty, snapshot), True]
+        if self.tile_poll_job is None:
+            self.tile_poll_job = self.canvas.after(TILE_POLL_MS, self.poll_tiles)
+            
+    def poll_tiles(self):
+        """Afficher les tuiles dont le rendu est terminé (thread Tk)"""
+        self.tile_poll_job = None
+        outdated = False
+        for key, (future, valid) in list(self.tile_jobs.items()):
+            if not future.done():
+                continue
+            del self.tile_jobs[key]
+            if not valid or key[1] != self.zoom:
+                outdated = True
+                continue
+            try:
+                photo = ImageTk.PhotoImage(future.result())
+            except Exception as e:
+                print(f"Erreur lors du rendu d'une tuile: {e}")
+                continue
+            self.cache_tile(key, photo)
+            self.show_tile(key[0], key[2], key[3], photo)
+        if outdated:
+            self.schedule_viewport_refresh()
+        if self.tile_jobs:
+            self.tile_poll_job = self.canvas.after(TILE_POLL_MS, self.poll_tiles)
+            
+    def cache_tile(self, key, photo):
+        """Garder une tuile rendue (None si elle est vide) dans le cache LRU"""
+        self.tile_cache[key] = photo
+        self.tile_cache.move_to_end(key)
+        while len(self.tile_cache) > TILE_CACHE_SIZE:
+            self.tile_cache.popitem(last=False)
+            
+    def show_tile(self, layer, tx, ty, photo):
+        """Afficher (ou retirer si photo est None) une tuile de la zone courante"""
+        tile = (layer, tx, ty)
+        item = self.tile_items.get(tile)
+        if photo is None:
+            if item is not None:
+                self.canvas.delete(item)
+                del self.tile_items[tile], self.tile_photos[tile]
+            return
+        if item is None:
+            item = self.canvas.create_image(tx * TILE_PIXELS, ty * TILE_PIXELS, image=photo,
+                                            anchor="nw", tags="tile")
+            self.tile_items[tile] = item
+            # Calque des formes sous les images, calque des tableaux au-dessus
+            if layer == TILED_KINDS[0]:
+                self.canvas.tag_lower(item)
+            elif self.selection:
+                self.canvas.tag_raise("selection")
+        elif self.tile_photos[tile] is not photo:
+            self.canvas.itemconfig(item, image=photo)
+        self.tile_photos[tile] = photo
+        
+    def invalidate_tiles(self, kind, bbox):
+        """Oublier les tuiles rendues qui recouvrent une zone modifiée du document"""
+        if kind not in TILED_KINDS or bbox is None or not (self.tile_cache or self.tile_jobs):
+            return
+        x1, y1, x2, y2 = bbox
         
+        def touches(key):
+            tx1, ty1, tx2, ty2 = tile_rect(*key[1:])
+            bleed = TILE_BLEED / key[1]
+            return key[0] == kind and tx1 - bleed <= x2 and x1 <= tx2 + bleed and ty1 - bleed <= y2 and y1 <= ty2 + bleed
+            
+        stale = [key for key in self.tile_cache if touches(key)]
+        for key in stale:
+            # La tuile affichée reste en place jusqu'à l'arrivée de son nouveau rendu
+            del self.tile_cache[key]
+        for key, job in self.tile_jobs.items():
+            if touches(key):
+                job[1] = False
+        if stale:
+            self.schedule_viewport_refresh()
+            
+    def clear_tiles(self):
+        """Retirer les tuiles affichées (le cache est conservé)"""
+        for item in self.tile_items.values():
+            self.canvas.delete(item)
+        self.tile_items.clear()
+        self.tile_photos.clear()
+        
+    def reset_tiles(self):
+        """Retirer les tuiles et oublier tous les rendus (document remplacé)"""
+        self.clear_tiles()
+        self.tile_cache.clear()
+        for job in self.tile_jobs.values():
+            job[1] = False
+        
+    def move_object(self, kind, obj, dx, dy):
+        """Déplacer un objet dans le document et sur le canvas"""
+        obj['coords'] = [c + (dx if i % 2 == 0 else dy) for i, c in enumerate(obj['coords'])]
+        items = self.object_items(kind, obj)
+        for item in items:
+            self.canvas.move(item, dx * self.zoom, dy * self.zoom)
+        self.update_bounds(kind, obj)
+        if obj['uid'] in self.selected_uids:
+            self.canvas.move(f"selection-{obj['uid']}", dx * self.zoom, dy * self.zoom)
+            
+    def reorder_object(self, kind, old_index, new_index):
+        """Changer la position d'un objet dans sa liste (et sur le canvas)"""
+        objects = getattr(self, kind)
+        self.untrack_drawn(kind, objects[old_index])
+        self.registry.move(kind, objects, old_index, new_index)
+        for item in self.object_items(kind, objects[new_index]):
+            self.canvas.tag_raise(item)
+        self.track_drawn(kind, objects[new_index])
+        
+    def start_drag(self, x, y):
+        """Commencer le déplacement des objets sélectionnés"""
+        self.drag_target = list(self.selection) or None
+        self.drag_last = (x, y)
+        self.drag_delta = (0, 0)
+                
+    def continue_drag(self, x, y):
+        dx = x - self.drag_last[0]
+        dy = y - self.drag_last[1]
+        for kind, obj in self.drag_target:
+            self.move_object(kind, obj, dx, dy)
+        self.drag_last = (x, y)
+        self.drag_delta = (self.drag_delta[0] + dx, self.drag_delta[1] + dy)
+        
+    def stop_drag(self):
+        if self.drag_target and self.drag_delta != (0, 0):
+            commands = [MoveCommand(kind, obj, *self.drag_delta) for kind, obj in self.drag_target]
+            self.history.push(commands[0] if len(commands) == 1 else BatchCommand(commands))
+            self.draw_selection()
+            self.update_status("Objet déplacé")
+        self.drag_target = None
+            
     def _deserialize_image(self, img_data):
         """Désérialiser une image"""
         try:
-            if os.path.exists(img_data['path']):
-                pil_image = PILImage.open(img_data['path'])
-                max_size = (300, 300)
-                pil_image.thumbnail(max_size, PILImage.Resampling.LANCZOS)
-                img = ImageTk.PhotoImage(pil_image)
-                
+            source = image_source(img_data)
+            if os.path.exists(source):
+                # Décodage différé : seule la taille est lue, la miniature
+                # est chargée quand l'image entre dans la zone visible
                 return {
                     'path': img_data['path'],
+                    'source': img_data.get('source'),
                     'coords': img_data['coords'],
-                    'image': img,
-                    'pil_image': pil_image,
+                    'size': thumbnail_size(source),
+                    'image': None,
+                    'pil_image': None,
                     'id': None  # Sera assigné lors du redessin
                 }
         except Exception as e:
             print(f"Erreur lors de la restauration de l'image {img_data['path']}: {e}")
         return None
         
-    def _deserialize_table(self, table_data):
-        """Désérialiser un tableau"""
-        return {
-            'coords': table_data['coords'],
-            'rows': table_data['rows'],
-            'cols': table_data['cols'],
-            'data': table_data['data'],
-            'cell_width': table_data['cell_width'],
-            'cell_height': table_data['cell_height'],
-            'items': []  # Sera rempli lors du redessin
-        }
-        
     def redraw_shape(self, shape):
         """Redessiner une forme sur le canvas"""
         try:
-            if shape['type'] == 'rectangle':
-                shape['id'] = self.canvas.create_rectangle(
-                    *shape['coords'], outline=shape['color'], width=shape.get('width', 2))
-            elif shape['type'] == 'circle':
-                shape['id'] = self.canvas.create_oval(
-                    *shape['coords'], outline=shape['color'], width=shape.get('width', 2))
-            elif shape['type'] in ['line', 'freehand']:
-                shape['id'] = self.canvas.create_line(
-                    *shape['coords'], fill=shape['color'], width=shape.get('width', 2))
-            elif shape['type'] == 'text':
-                shape['id'] = self.canvas.create_text(
-                    *shape['coords'], text=shape.get('text', ''), 
-                    font=shape.get('font', ('Arial', 12)), 
-                    fill=shape['color'], anchor="nw")
+            create = getattr(self.canvas, "create_" + SHAPE_ITEM_TYPES[shape['type']])
+            shape['id'] = create(*scale_coords(shape['coords'], self.zoom), **shape_item_options(shape, self.zoom))
         except Exception as e:
             print(f"Erreur lors du redessin de la forme: {e}")
     
     def redraw_image(self, image):
         """Redessiner une image sur le canvas"""
         try:
-            x, y = image['coords']
-            img = image['image']
+            x, y = scale_coords(image['coords'], self.zoom)
+            img = self.ensure_photo(image)
             image['id'] = self.canvas.create_image(x, y, image=img, anchor="nw")
         except Exception as e:
             print(f"Erreur lors du redessin de l'image: {e}")
     
     def redraw_table(self, table):
         """Redessiner un tableau sur le canvas"""
-        x, y = table['coords']
+        x, y = scale_coords(table['coords'], self.zoom)
         rows, cols = table['rows'], table['cols']
-        cell_width, cell_height = table['cell_width'], table['cell_height']
-        
-        table_items = []
-        for i in range(rows):
-            for j in range(cols):
-                cell_x = x + j * cell_width
-                cell_y = y + i * cell_height
-                
-                rect_id = self.canvas.create_rectangle(
-                    cell_x, cell_y, cell_x + cell_width, cell_y + cell_height,
-                    outline="black", fill="white")
-                
-                text_id = self.canvas.create_text(
-                    cell_x + cell_width//2, cell_y + cell_height//2,
-                    text=f"Cellule {i+1},{j+1}", font=("Arial", 9))
-                
-                table_items.extend([rect_id, text_id])
+        cell_width, cell_height = scale_coords([table['cell_width'], table['cell_height']], self.zoom)
+        font_spec = scale_font(("Arial", 9), self.zoom)
+        
+        # Fond et cadre, grille intérieure en une polyligne, texte des seules cellules remplies
+        table_items = [self.canvas.create_rectangle(x, y, x + cols * cell_width, y + rows * cell_height,
+                                                    outline="black", fill="white")]
+        grid = table_grid_polyline(x, y, rows, cols, cell_width, cell_height)
+        if grid:
+            table_items.append(self.canvas.create_line(*grid, fill="black"))
+        for i, j, text in table_cells(table):
+            table_items.append(self.canvas.create_text(
+                x + (j + 0.5) * cell_width, y + (i + 0.5) * cell_height,
+                text=text, font=font_spec))
         
         table['items'] = table_items
     
@@ -1733,7 +4575,7 @@ class TableDialog:
         
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Créer un tableau")
-        self.dialog.geometry("300x200")
+        self.dialog.geometry("420x260")
         self.dialog.transient(parent)
         self.dialog.grab_set()
         
@@ -1754,6 +4596,13 @@ class TableDialog:
         self.cols_spinbox = tk.Spinbox(frame, from_=1, to=10, width=10, value=3)
         self.cols_spinbox.grid(row=1, column=1, padx=10, pady=5)
         
+        # Source de données optionnelle : les lignes sont lues à l'export, les
+        # lignes ci-dessus ne servent qu'à l'aperçu (en-tête compris)
+        tk.Label(frame, text="Source:").grid(row=2, column=0, padx=10, pady=5, sticky="e")
+        self.source_var = tk.StringVar()
+        tk.Entry(frame, textvariable=self.source_var, width=22).grid(row=2, column=1, padx=10, pady=5)
+        tk.Button(frame, text="Parcourir...", command=self.browse_source).grid(row=2, column=2, pady=5)
+        
         button_frame = tk.Frame(self.dialog)
         button_frame.pack(pady=20)
         
@@ -1773,12 +4622,23 @@ class TableDialog:
             cols = int(self.cols_spinbox.get())
             if rows < 1 or cols < 1:
                 raise ValueError("Les valeurs doivent être positives")
-            self.result = (rows, cols)
+            source = self.source_var.get().strip() or None
+            if source and not os.path.exists(source):
+                raise ValueError(f"fichier introuvable: {source}")
+            self.result = (rows, cols, source)
         except ValueError as e:
             messagebox.showerror("Erreur", f"Veuillez entrer des nombres valides: {e}")
             return
         self.dialog.destroy()
         
+    def browse_source(self):
+        file_path = filedialog.askopenfilename(
+            parent=self.dialog,
+            filetypes=[("Données", "*.csv *.jsonl *.ndjson"), ("Tous les fichiers", "*.*")]
+        )
+        if file_path:
+            self.source_var.set(file_path)
+        
     def cancel_clicked(self):
         self.result = None
         self.dialog.destroy()
@@ -1835,5 +4695,365 @@ def main():
             print("Impossible d'afficher la boîte de dialogue d'erreur")
 
 
+# === RENDU EN LOT (LIGNE DE COMMANDE) ===
+
+def is_template_file(path):
+    """Fichier existant portant l'extension d'un template JSON ou d'un projet"""
+    return path.lower().endswith(('.json', PROJECT_EXTENSION)) and os.path.isfile(path)
+
+
+def collect_templates(sources):
+    """Lister les templates (JSON ou projets) à partir de dossiers, de motifs glob ou de fichiers"""
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths.extend(sorted(glob.glob(os.path.join(source, "*.json")) +
+                                glob.glob(os.path.join(source, "*" + PROJECT_EXTENSION))))
+        elif glob.has_magic(source):
+            paths.extend(sorted(filter(is_template_file, glob.glob(source, recursive=True))))
+        else:
+            paths.append(source)
+    # Supprimer les doublons en conservant l'ordre
+    return list(dict.fromkeys(paths))
+
+
+_image_pools = {}
+
+
+def shared_image_pool(dpi=DEFAULT_IMAGE_DPI, jpeg_quality=None):
+    """Pool d'images commun aux documents rendus par ce processus"""
+    key = (dpi, jpeg_quality)
+    if key not in _image_pools:
+        _image_pools[key] = PDFImagePool(dpi, jpeg_quality)
+    return _image_pools[key]
+
+
+def render_template_file(template_path, output_path, image_dpi=DEFAULT_IMAGE_DPI, jpeg_quality=None,
+                         use_cache=True):
+    """Rendre un template en PDF, retourne (template, pdf, durée, erreur)"""
+    start = time.perf_counter()
+    try:
+        image_pool = shared_image_pool(image_dpi, jpeg_quality)
+        renderer = PDFRenderer(DocumentModel.load(template_path), image_pool)
+        if use_cache:
+            renderer.render_cached(output_path, shared_export_cache())
+        else:
+            renderer.render(output_path)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return template_path, output_path, time.perf_counter() - start, error
+
+
+def batch_output_paths(template_paths, output_dir=None):
+    """PDF à produire pour chaque template : à côté du template, ou dans output_dir.
+    
+    Dans output_dir, les templates de dossiers différents portant le même nom
+    gardent leur chemin relatif au dossier commun, pour ne pas s'écraser ;
+    ValueError si deux templates donneraient encore le même PDF.
+    """
+    names = [os.path.splitext(os.path.basename(path))[0] + ".pdf" for path in template_paths]
+    if not output_dir:
+        return [os.path.join(os.path.dirname(os.path.abspath(path)), name)
+                for path, name in zip(template_paths, names)]
+    counts = Counter(names)
+    colliding = [os.path.abspath(path) for path, name in zip(template_paths, names) if counts[name] > 1]
+    root = os.path.commonpath([os.path.dirname(path) for path in colliding]) if colliding else None
+    outputs = []
+    for path, name in zip(template_paths, names):
+        if counts[name] > 1:
+            relative = os.path.relpath(os.path.dirname(os.path.abspath(path)), root)
+            name = os.path.normpath(os.path.join(relative, name))
+        outputs.append(os.path.join(output_dir, name))
+    seen = {}
+    for path, output_path in zip(template_paths, outputs):
+        other = seen.setdefault(os.path.normcase(os.path.abspath(output_path)), path)
+        if other is not path:
+            raise ValueError(f"{other} et {path} produiraient le même PDF {output_path}")
+    return outputs
+
+
+def batch_render(template_paths, output_dir=None, workers=None, on_result=None,
+                 image_dpi=DEFAULT_IMAGE_DPI, jpeg_quality=None, use_cache=True):
+    """Rendre des templates en parallèle avec un pool de processus"""
+    jobs = list(zip(template_paths, batch_output_paths(template_paths, output_dir)))
+    for target_dir in {os.path.dirname(output_path) for _, output_path in jobs} if output_dir else ():
+        os.makedirs(target_dir, exist_ok=True)
+    
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(render_template_file, *job, image_dpi, jpeg_quality, use_cache)
+                   for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if on_result:
+                on_result(result)
+    return results
+
+
+# === PUBLIPOSTAGE ===
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*([^{}]+?)\s*\}\}")
+
+
+def fill_placeholders(text, record, escape_values=False):
+    """Remplacer les champs {{nom}} par les valeurs de l'enregistrement"""
+    def replace(match):
+        value = record.get(match.group(1))
+        value = '' if value is None else str(value)
+        return xml_escape(value) if escape_values else value
+    return PLACEHOLDER_PATTERN.sub(replace, text)
+
+
+def iter_records(path):
+    """Lire un fichier CSV ou JSONL enregistrement par enregistrement"""
+    if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson'):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            yield from csv.DictReader(f)
+
+
+class MergeEngine:
+    """Publipostage : le template est analysé une fois puis rempli pour chaque enregistrement"""
+    def __init__(self, document, image_pool=None):
+        self.document = document
+        self.image_pool = image_pool or PDFImagePool()
+        
+        # Repérer une fois pour toutes les éléments qui contiennent des champs
+        self.text_has_fields = bool(PLACEHOLDER_PATTERN.search(document.text))
+        self.shape_fields = [i for i, shape in enumerate(document.shapes)
+                             if shape['type'] == 'text' and PLACEHOLDER_PATTERN.search(shape.get('text') or '')]
+        self.table_fields = []
+        for i, table in enumerate(document.tables):
+            cells = [(r, c) for r, row in enumerate(table['data']) for c, cell in enumerate(row)
+                     if cell and PLACEHOLDER_PATTERN.search(cell)]
+            if cells:
+                self.table_fields.append((i, cells))
+                
+    def document_for(self, record):
+        """Document rempli pour un enregistrement (les éléments sans champ sont partagés)"""
+        template = self.document
+        merged = copy.copy(template)
+        if self.text_has_fields:
+            # Le texte est interprété comme du balisage Paragraph
+            merged.text = fill_placeholders(template.text, record, escape_values=True)
+        if self.shape_fields:
+            merged.shapes = list(template.shapes)
+            for i in self.shape_fields:
+                shape = template.shapes[i].copy()
+                shape['text'] = fill_placeholders(shape['text'], record)
+                merged.shapes[i] = shape
+        if self.table_fields:
+            merged.tables = list(template.tables)
+            for i, cells in self.table_fields:
+                table = dict(template.tables[i])
+                table['data'] = [list(row) for row in table['data']]
+                for r, c in cells:
+                    table['data'][r][c] = fill_placeholders(table['data'][r][c], record)
+                merged.tables[i] = table
+        return merged
+        
+    def render_record(self, record, output_path):
+        """Rendre un enregistrement dans son propre PDF"""
+        PDFRenderer(self.document_for(record), self.image_pool).render(output_path)
+        
+    def render_combined(self, records, output_path):
+        """Rendre tous les enregistrements dans un seul PDF multi-pages"""
+        return PDFRenderer.render_combined((self.document_for(r) for r in records), output_path,
+                                           self.image_pool)
+
+
+def merge_output_path(output_dir, name_pattern, record, number, used=None):
+    """Nom du PDF d'un enregistrement ({{_n}} = numéro de l'enregistrement).
+    
+    used est l'ensemble des noms déjà attribués (complété ici) : un nom déjà
+    pris reçoit un suffixe _2, _3... au lieu d'écraser le PDF précédent.
+    """
+    name = fill_placeholders(name_pattern, dict(record, _n=number))
+    name = re.sub(r'[\\/:*?"<>|]+', '_', name).strip() or f"document_{number}.pdf"
+    if not name.lower().endswith(".pdf"):
+        name += ".pdf"
+    if used is not None:
+        stem, suffix = name[:-4], name[-4:]
+        n = 1
+        while os.path.normcase(name) in used:
+            n += 1
+            name = f"{stem}_{n}{suffix}"
+        used.add(os.path.normcase(name))
+    return os.path.join(output_dir, name)
+
+
+_merge_engine = None
+
+
+def _init_merge_worker(template_path, image_dpi=DEFAULT_IMAGE_DPI, jpeg_quality=None):
+    """Initialiser un processus de publipostage : le template est chargé une seule fois"""
+    global _merge_engine
+    _merge_engine = MergeEngine(DocumentModel.load(template_path),
+                                shared_image_pool(image_dpi, jpeg_quality))
+
+
+def _merge_worker(record, output_path):
+    start = time.perf_counter()
+    try:
+        _merge_engine.render_record(record, output_path)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return output_path, time.perf_counter() - start, error
+
+
+def merge_render(template_path, records, output_dir, name_pattern="document_{{_n}}.pdf",
+                 workers=None, on_result=None, image_dpi=DEFAULT_IMAGE_DPI, jpeg_quality=None):
+    """Rendre un PDF par enregistrement avec un pool de processus.
+    
+    Les enregistrements sont lus au fil de l'eau et le nombre de tâches en
+    attente est borné ; chaque résultat (pdf, durée, erreur) n'est transmis
+    qu'à on_result, seuls les noms des PDF sont gardés (pour qu'un nom en
+    double ne fasse pas écraser un PDF). Retourne (nombre de PDF, nombre d'échecs).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    count = failures = 0
+    used = set()
+    
+    def collect(done):
+        nonlocal count, failures
+        for future in done:
+            result = future.result()
+            count += 1
+            if result[2]:
+                failures += 1
+            if on_result:
+                on_result(result)
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_merge_worker,
+                             initargs=(template_path, image_dpi, jpeg_quality)) as executor:
+        pending = set()
+        for number, record in enumerate(records, 1):
+            output_path = merge_output_path(output_dir, name_pattern, record, number, used)
+            pending.add(executor.submit(_merge_worker, record, output_path))
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        collect(as_completed(pending))
+    return count, failures
+
+
+def cli_main(argv=None):
+    """Point d'entrée en ligne de commande (sans interface graphique)"""
+    parser = argparse.ArgumentParser(prog="main.py", description="PDF Editor Pro - rendu sans interface")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    render_parser = subparsers.add_parser("render", help="Rendre des templates JSON en PDF")
+    render_parser.add_argument("sources", nargs="+", help="Dossiers, motifs glob ou fichiers .json / .pdfproj")
+    render_parser.add_argument("-o", "--output-dir", help="Dossier de sortie (par défaut: à côté du template)")
+    render_parser.add_argument("-j", "--workers", type=int, default=None,
+                               help="Nombre de processus (par défaut: nombre de cœurs)")
+    render_parser.add_argument("--no-cache", dest="use_cache", action="store_false",
+                               help="Toujours refaire le rendu (ignorer le cache d'export)")
+    
+    merge_parser = subparsers.add_parser("merge", help="Publipostage à partir d'un fichier CSV ou JSONL")
+    merge_parser.add_argument("template", help="Template JSON contenant des champs {{nom}}")
+    merge_parser.add_argument("records", help="Fichier d'enregistrements .csv ou .jsonl")
+    merge_parser.add_argument("-o", "--output-dir", default=".", help="Dossier de sortie (un PDF par enregistrement)")
+    merge_parser.add_argument("--name", default="document_{{_n}}.pdf",
+                              help="Modèle de nom de fichier, par ex. facture_{{numero}}.pdf")
+    merge_parser.add_argument("--combined", metavar="PDF", help="Produire un seul PDF multi-pages")
+    merge_parser.add_argument("-j", "--workers", type=int, default=None,
+                              help="Nombre de processus (par défaut: nombre de cœurs)")
+    
+    text_parser = subparsers.add_parser("text", help="Mettre en page un texte brut (fichier ou entrée standard)")
+    text_parser.add_argument("source", help="Fichier texte (UTF-8), ou - pour l'entrée standard")
+    text_parser.add_argument("-o", "--output", required=True, help="PDF à produire")
+    text_parser.add_argument("--template", help="Template donnant le format, les marges, la police et les graphiques")
+    
+    for sub in (render_parser, merge_parser, text_parser):
+        sub.add_argument("--image-dpi", type=int, default=DEFAULT_IMAGE_DPI,
+                         help=f"Résolution des images embarquées (par défaut: {DEFAULT_IMAGE_DPI})")
+        sub.add_argument("--jpeg-quality", type=int, default=None,
+                         help="Recompresser les images en JPEG avec cette qualité (1-95)")
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == "render":
+        template_paths = collect_templates(args.sources)
+        if not template_paths:
+            print("Aucun template trouvé")
+            return 1
+        
+        def report(result):
+            template_path, output_path, duration, error = result
+            status = "ERREUR" if error else "OK"
+            print(f"[{status}] {template_path} -> {output_path} ({duration * 1000:.0f} ms)")
+        
+        start = time.perf_counter()
+        try:
+            results = batch_render(template_paths, args.output_dir, args.workers, on_result=report,
+                                   image_dpi=args.image_dpi, jpeg_quality=args.jpeg_quality,
+                                   use_cache=args.use_cache)
+        except ValueError as e:
+            print(f"Erreur: {e}")
+            return 1
+        elapsed = time.perf_counter() - start
+        
+        failures = [r for r in results if r[3]]
+        print(f"\n{len(results) - len(failures)}/{len(results)} PDF générés en {elapsed:.2f} s")
+        if failures:
+            print(f"{len(failures)} échec(s):")
+            for template_path, _, _, error in failures:
+                print(f"  - {template_path}: {error}")
+            return 1
+            
+    elif args.command == "merge":
+        start = time.perf_counter()
+        records = iter_records(args.records)
+        if args.combined:
+            engine = MergeEngine(DocumentModel.load(args.template),
+                                 PDFImagePool(args.image_dpi, args.jpeg_quality))
+            count = engine.render_combined(records, args.combined)
+            print(f"{count} enregistrement(s) -> {args.combined} en {time.perf_counter() - start:.2f} s")
+            return 0
+        
+        def report(result):
+            output_path, duration, error = result
+            if error:
+                print(f"[ERREUR] {output_path}: {error}")
+        
+        count, failures = merge_render(args.template, records, args.output_dir, args.name,
+                                       args.workers, on_result=report,
+                                       image_dpi=args.image_dpi, jpeg_quality=args.jpeg_quality)
+        print(f"{count - failures}/{count} PDF générés en {time.perf_counter() - start:.2f} s")
+        if failures:
+            return 1
+            
+    elif args.command == "text":
+        start = time.perf_counter()
+        document = DocumentModel.load(args.template) if args.template else DocumentModel()
+        pool = PDFImagePool(args.image_dpi, args.jpeg_quality)
+        
+        def report(event, value):
+            if event == 'PAGE' and value % 100 == 0:
+                print(f"{value} pages...", file=sys.stderr)
+        
+        # Le texte est lu ligne à ligne pendant la mise en page
+        if args.source == "-":
+            document.text_stream = sys.stdin
+            PDFRenderer(document, pool).render(args.output, report)
+        else:
+            with open(args.source, 'r', encoding='utf-8') as f:
+                document.text_stream = f
+                PDFRenderer(document, pool).render(args.output, report)
+        print(f"{args.source} -> {args.output} en {time.perf_counter() - start:.2f} s")
+    return 0
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(cli_main())
     main()
\ No newline at end of file
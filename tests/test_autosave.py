@@ -0,0 +1,107 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import main
+
+
+class StubJournal:
+    def __init__(self):
+        self.entries = []
+        
+    def append(self, entry):
+        self.entries.append(entry)
+
+
+class StubEditor:
+    """Juste ce qu'il faut à journal_command : listes d'objets et recherche par uid"""
+    def __init__(self, shapes):
+        self.shapes = shapes
+        self.images = []
+        self.tables = []
+        self.journal = StubJournal()
+        
+    def object_by_uid(self, uid):
+        for kind in main.LAYER_KINDS:
+            for obj in getattr(self, kind):
+                if obj['uid'] == uid:
+                    return kind, obj
+        return None, None
+        
+    def index_of(self, kind, obj):
+        return next(i for i, candidate in enumerate(getattr(self, kind)) if candidate is obj)
+        
+    def insert_object(self, kind, obj, index):
+        getattr(self, kind).insert(index, obj)
+        
+    def remove_object(self, kind, obj):
+        index = self.index_of(kind, obj)
+        del getattr(self, kind)[index]
+        return index
+        
+    def reorder_object(self, kind, old_index, new_index):
+        objects = getattr(self, kind)
+        objects.insert(new_index, objects.pop(old_index))
+
+
+def make_shapes(count):
+    shapes = []
+    for i in range(count):
+        shape = main.ShapeRecord('rectangle', [i, i, i + 10, i + 10], '#000000', width=2)
+        shape['uid'] = 100 + i
+        shapes.append(shape)
+    return shapes
+
+
+def replay(tmp_path, editor, snapshot_shapes):
+    """Rejouer un instantané suivi des entrées journalisées par l'éditeur"""
+    document = main.DocumentModel()
+    document.shapes = snapshot_shapes
+    snapshot = {'op': 'snapshot', 'document': document.to_dict(),
+                'uids': {'shapes': [s['uid'] for s in snapshot_shapes], 'images': [], 'tables': []}}
+    path = tmp_path / "autosave.journal"
+    lines = [snapshot] + editor.journal.entries
+    path.write_text(''.join(json.dumps(entry) + '\n' for entry in lines), encoding='utf-8')
+    return [shape['coords'][0] for shape in main.replay_journal(str(path)).shapes]
+
+
+def run_and_journal(editor, command, action):
+    getattr(command, action)(editor)
+    main.AdvancedPDFEditor.journal_command(editor, command)
+
+
+def test_undo_of_multi_delete_keeps_stacking_order(tmp_path):
+    shapes = make_shapes(5)
+    editor = StubEditor(list(shapes))
+    # Comme delete_selected : du dernier au premier
+    commands = []
+    for obj in (shapes[3], shapes[1]):
+        commands.append(main.DeleteCommand('shapes', obj, editor.remove_object('shapes', obj)))
+    batch = main.BatchCommand(commands)
+    main.AdvancedPDFEditor.journal_command(editor, batch)
+    assert replay(tmp_path, editor, shapes) == [0, 2, 4]
+    
+    run_and_journal(editor, batch, 'revert')
+    assert replay(tmp_path, editor, shapes) == [0, 1, 2, 3, 4]
+    
+    run_and_journal(editor, batch, 'apply')
+    assert replay(tmp_path, editor, shapes) == [0, 2, 4]
+
+
+def test_undo_redo_of_reorder_batch(tmp_path):
+    shapes = make_shapes(5)
+    editor = StubEditor(list(shapes))
+    editor.reorder_object('shapes', 4, 0)
+    editor.reorder_object('shapes', 1, 3)
+    batch = main.BatchCommand([main.ReorderCommand('shapes', 4, 0), main.ReorderCommand('shapes', 1, 3)])
+    main.AdvancedPDFEditor.journal_command(editor, batch)
+    expected = [shape['coords'][0] for shape in editor.shapes]
+    assert replay(tmp_path, editor, shapes) == expected
+    
+    run_and_journal(editor, batch, 'revert')
+    assert replay(tmp_path, editor, shapes) == [0, 1, 2, 3, 4]
+    
+    run_and_journal(editor, batch, 'apply')
+    assert replay(tmp_path, editor, shapes) == expected
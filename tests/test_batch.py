@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import main
+
+
+def test_batch_outputs_keep_subpath_for_colliding_names(tmp_path):
+    out = str(tmp_path / "sortie")
+    paths = [str(tmp_path / "a" / "facture.json"), str(tmp_path / "b" / "facture.json"),
+             str(tmp_path / "a" / "devis.json")]
+    assert main.batch_output_paths(paths, out) == [
+        os.path.join(out, "a", "facture.pdf"),
+        os.path.join(out, "b", "facture.pdf"),
+        os.path.join(out, "devis.pdf"),
+    ]
+    with pytest.raises(ValueError):
+        main.batch_output_paths([str(tmp_path / "a" / "x.json"), str(tmp_path / "a" / "x.pdfproj")], out)
+
+
+def test_glob_sources_keep_only_template_files(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "sous-dossier.json").mkdir()
+    for name in ("a/facture.json", "a/plan.pdfproj", "a/notes.txt", "devis.json"):
+        (tmp_path / name).write_text("{}")
+    found = main.collect_templates([str(tmp_path / "**" / "*")])
+    assert sorted(os.path.relpath(path, tmp_path) for path in found) == [
+        os.path.join("a", "facture.json"),
+        os.path.join("a", "plan.pdfproj"),
+        "devis.json",
+    ]
@@ -0,0 +1,20 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import main
+
+
+def test_unwritable_cache_does_not_fail_the_export(tmp_path):
+    # Un fichier à la place d'un dossier : toute écriture dans le cache échoue
+    blocker = tmp_path / "bloque"
+    blocker.write_text("")
+    cache = main.ExportCache(str(blocker / "cache"))
+    renderer = main.PDFRenderer(main.DocumentModel(), main.PDFImagePool())
+    path = str(tmp_path / "document.pdf")
+
+    assert renderer.render_cached(path, cache) is False
+    with open(path, 'rb') as f:
+        assert f.read(5) == b"%PDF-"
+    assert sorted(os.listdir(tmp_path)) == ["bloque", "document.pdf"]
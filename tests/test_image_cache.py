@@ -0,0 +1,26 @@
+import os
+import sys
+
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import main
+
+
+def test_evicted_photos_release_their_whole_cost(tmp_path, monkeypatch):
+    # PhotoImage demande un interpréteur Tk ; seul le comptage est vérifié ici
+    monkeypatch.setattr(main.ImageTk, 'PhotoImage', lambda image: object())
+    paths = []
+    for i in range(6):
+        path = tmp_path / f"image{i}.png"
+        Image.new('RGB', (100, 100), (i * 40, 0, 0)).save(path)
+        paths.append(str(path))
+    # Place pour trois miniatures avec leur PhotoImage
+    cache = main.ImageCache(max_bytes=3 * 2 * 100 * 100 * 3)
+    for _ in range(3):
+        for path in paths:
+            cache.get_photo(path)
+    stats = cache.stats()
+    assert stats['bytes'] == sum(entry[2] for entry in cache.entries.values())
+    assert stats['entries'] == 3
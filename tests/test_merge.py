@@ -0,0 +1,14 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import main
+
+
+def test_duplicate_merge_names_get_a_suffix():
+    used = set()
+    names = [os.path.basename(main.merge_output_path("sortie", "facture_{{numero}}", record, n, used))
+             for n, record in enumerate([{'numero': '7'}, {'numero': '8'}, {'numero': '7'},
+                                         {'numero': '7_2'}], 1)]
+    assert names == ["facture_7.pdf", "facture_8.pdf", "facture_7_2.pdf", "facture_7_2_2.pdf"]
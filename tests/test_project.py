@@ -0,0 +1,24 @@
+import os
+import sys
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import main
+
+
+def test_empty_freehand_shape_round_trips(tmp_path):
+    document = main.DocumentModel()
+    document.shapes = [
+        main.ShapeRecord('freehand', array('d', []), '#000000', width=3),
+        main.ShapeRecord('line', [10, 20, 30, 40], '#FF0000', width=2),
+    ]
+    path = str(tmp_path / "dessin.pdfproj")
+    main.save_project(document, path)
+
+    shapes = main.load_project(path).shapes
+    assert [s.type for s in shapes] == ['freehand', 'line']
+    assert list(shapes[0].coords) == []
+    assert list(shapes[1].coords) == [10, 20, 30, 40]
+    with main.ProjectReader(path) as reader:
+        assert reader.shapes_in(5, 15, 35, 45) == [1]